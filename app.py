@@ -1,47 +1,132 @@
 import streamlit as st
-from supabase import create_client
 import math
+import re
+import html
+import openai
+from concurrent.futures import ThreadPoolExecutor
+from store import (
+    PAGE_SIZE, get_client, fetch_summaries, skip_rows, count_summaries,
+    search_summaries, fetch_one, fetch_transcript, fetch_related, fetch_all_tags, delete_summary,
+)
 
 # ── 설정 ────────────────────────────────────────────
-SUPABASE_URL = st.secrets["supabase"]["url"]
-SUPABASE_KEY = st.secrets["supabase"]["anon_key"]
 COLS = 5
-ROWS = 3
-PAGE_SIZE = COLS * ROWS  # 15
-
-# ── Supabase 클라이언트 ──────────────────────────────
+ROWS = PAGE_SIZE // COLS  # 3
+EMBED_MODEL = "text-embedding-3-small"
+CHUNK_CHARS = 1200    # 챗봇 검색용 STT 청크 크기
+CHUNK_OVERLAP = 200
+TOP_K = 6             # 질문당 프롬프트에 넣을 청크 수
+CHAT_MODEL = "gpt-4o"
+
+# ── OpenAI 클라이언트 (커넥션 풀 재사용) ─────────────
 @st.cache_resource
-def get_client():
-    return create_client(SUPABASE_URL, SUPABASE_KEY)
-
-def fetch_summaries(page: int, search: str = "", tag: str = ""):
-    client = get_client()
-    offset = (page - 1) * PAGE_SIZE
-    q = client.table("youtube_summaries").select("*", count="exact")
-    if search:
-        q = q.ilike("title", f"%{search}%")
-    if tag:
-        q = q.contains("tags", [tag])
-    res = q.order("created_at", desc=True).range(offset, offset + PAGE_SIZE - 1).execute()
-    return res.data, res.count
-
-def fetch_one(item_id: str):
-    client = get_client()
-    res = client.table("youtube_summaries").select("*").eq("id", item_id).execute()
-    return res.data[0] if res.data else None
-
-def fetch_all_tags():
+def get_openai():
+    # 세션/재실행마다 새 TLS 연결을 만들지 않도록 프로세스 전체에서 하나만 사용
+    # 타임아웃·429·5xx는 SDK가 지수 백오프로 재시도
+    return openai.OpenAI(
+        api_key=st.secrets["openai"]["api_key"],
+        timeout=openai.Timeout(60.0, connect=5.0),
+        max_retries=3,
+    )
+
+def stream_chat(messages: list):
+    stream = get_openai().chat.completions.create(
+        model=CHAT_MODEL,
+        max_tokens=1024,
+        messages=messages,
+        stream=True,
+    )
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+def highlight(text: str, query: str) -> str:
+    """스니펫 HTML 이스케이프 후 검색어(공백으로 나눈 단어별)를 <mark>로 강조"""
+    words = sorted({w for w in query.split() if w}, key=len, reverse=True)
+    if not words:
+        return html.escape(text)
+    pattern = re.compile("|".join(re.escape(w) for w in words), re.IGNORECASE)
+    out, last = [], 0
+    for m in pattern.finditer(text):
+        out.append(html.escape(text[last:m.start()]))
+        out.append(f"<mark>{html.escape(m.group(0))}</mark>")
+        last = m.end()
+    out.append(html.escape(text[last:]))
+    return "".join(out)
+
+# ── 다음 페이지 선읽기 ───────────────────────────────
+@st.cache_resource
+def get_prefetcher():
+    # 세션 간 공유: 선읽기 결과는 st.cache_data에 들어가므로 누구의 다음 클릭이든 캐시 적중
+    return {"pool": ThreadPoolExecutor(max_workers=2, thread_name_prefix="prefetch"), "pending": {}}
+
+def prefetch(fn, *args):
+    """fn(*args)를 백그라운드에서 미리 호출해 캐시를 채워 둠"""
+    pf = get_prefetcher()
+    key = (fn.__name__, args)
+    fut = pf["pending"].get(key)
+    if fut is None or fut.done():
+        pf["pending"][key] = pf["pool"].submit(fn, *args)
+
+def wait_prefetch(fn, *args):
+    # 같은 호출의 선읽기가 진행 중이면 중복 요청 대신 끝나길 기다림
+    fut = get_prefetcher()["pending"].pop((fn.__name__, args), None)
+    if fut is not None:
+        try:
+            fut.result(timeout=10)
+        except Exception as e:
+            print(f"선읽기 오류: {e}")
+
+# ── 챗봇용 STT 청크 인덱스 ───────────────────────────
+def chunk_transcript(text: str) -> list:
+    """문장 경계 기준 CHUNK_CHARS 크기 청크 (앞 청크와 CHUNK_OVERLAP만큼 겹침)"""
+    sentences = [s for s in re.split(r"(?<=[.!?…。])\s+|\n+", text) if s.strip()]
+    chunks, buf = [], ""
+    for sent in sentences:
+        while len(sent) > CHUNK_CHARS:  # 구두점 없는 자동자막
+            head, sent = sent[:CHUNK_CHARS], sent[CHUNK_CHARS - CHUNK_OVERLAP:]
+            if buf:
+                chunks.append(buf)
+                buf = ""
+            chunks.append(head)
+        if buf and len(buf) + len(sent) + 1 > CHUNK_CHARS:
+            chunks.append(buf)
+            buf = buf[-CHUNK_OVERLAP:]
+        buf = f"{buf} {sent}" if buf else sent
+    if buf:
+        chunks.append(buf)
+    return chunks
+
+def embed(texts: list) -> list:
+    res = get_openai().embeddings.create(model=EMBED_MODEL, input=texts)
+    return [d.embedding for d in sorted(res.data, key=lambda d: d.index)]
+
+@st.cache_data(show_spinner=False)
+def ensure_chunk_index(item_id: str, _stt: str) -> int:
+    """요약 1건의 STT 청크 임베딩이 없으면 만들어 summary_chunks에 저장 (항목당 1회)"""
     client = get_client()
-    res = client.table("youtube_summaries").select("tags").execute()
-    tags = set()
-    for row in res.data:
-        if row.get("tags"):
-            tags.update(row["tags"])
-    return sorted(tags)
-
-def delete_summary(item_id: str):
+    res = client.table("summary_chunks").select("idx", count="exact").eq("summary_id", item_id).limit(1).execute()
+    if res.count:
+        return res.count
+    chunks = chunk_transcript(_stt)
+    rows = []
+    for start in range(0, len(chunks), 100):
+        batch = chunks[start:start + 100]
+        for i, (content, vec) in enumerate(zip(batch, embed(batch)), start):
+            rows.append({"summary_id": item_id, "idx": i, "content": content, "embedding": vec})
+    if rows:
+        client.table("summary_chunks").upsert(rows).execute()
+    return len(rows)
+
+def retrieve_chunks(item_id: str, question: str, k: int = TOP_K) -> list:
     client = get_client()
-    client.table("youtube_summaries").delete().eq("id", item_id).execute()
+    res = client.rpc("match_summary_chunks", {
+        "p_summary_id": item_id,
+        "p_query": embed([question])[0],
+        "p_count": k,
+    }).execute()
+    # 영상 흐름대로 보이도록 원래 순서로 정렬
+    return sorted(res.data or [], key=lambda c: c["idx"])
 
 # ── 페이지 설정 ──────────────────────────────────────
 st.set_page_config(page_title="내 유튜브 요약 대시보드", layout="wide", page_icon="🎬", initial_sidebar_state="auto")
@@ -110,6 +195,17 @@ st.markdown("""
     font-weight: 500;
 }
 .yt-date { font-size: 0.68rem; color: #9ca3af; }
+.yt-snippet {
+    font-size: 0.7rem;
+    color: #6b7280;
+    line-height: 1.4;
+    display: -webkit-box;
+    -webkit-line-clamp: 3;
+    -webkit-box-orient: vertical;
+    overflow: hidden;
+    margin-bottom: 6px;
+}
+.yt-snippet mark { background: #fef08a; padding: 0 1px; border-radius: 2px; }
 </style>
 """, unsafe_allow_html=True)
 
@@ -121,13 +217,16 @@ for k, v in [("page", 1), ("selected", None), ("confirm_delete", None)]:
 # ── URL 파라미터로 특정 카드 자동 오픈 ──────────────
 params = st.query_params
 if "card" in params and not st.session_state.selected:
-    item = fetch_one(params["card"])
-    if item:
-        st.session_state.selected = item
+    st.session_state.selected = params["card"]
 
 # ── 상세 페이지 뷰 ───────────────────────────────────
-if st.session_state.selected:
-    item = st.session_state.selected
+# selected에는 id만 두고, 전체 필드는 열 때 fetch_one으로 불러옴
+item = fetch_one(st.session_state.selected) if st.session_state.selected else None
+if st.session_state.selected and not item:
+    st.session_state.selected = None
+    st.query_params.clear()
+
+if item:
 
     if st.button("← 목록으로 돌아가기"):
         st.session_state.selected = None
@@ -192,7 +291,11 @@ if st.session_state.selected:
     with tab1:
         st.markdown(item.get("summary_text") or "_요약 내용이 없습니다._")
     with tab2:
-        st.text_area("전체 스크립트", item.get("video_stt_url") or "_STT 내용이 없습니다._", height=400)
+        # 탭 내용은 상세 보기마다 모두 실행되므로 스크립트는 요청할 때만 불러와 압축 해제
+        stt_key = f"stt_{item['id']}"
+        if st.session_state.get(stt_key) or st.button("📄 스크립트 불러오기", key=f"load_{stt_key}"):
+            st.session_state[stt_key] = True
+            st.text_area("전체 스크립트", fetch_transcript(item["id"]) or "_STT 내용이 없습니다._", height=400)
     with tab3:
         st.markdown("#### 💬 영상 내용 기반 챗봇")
         st.caption("이 영상의 STT 내용을 기반으로 답변하며, 필요 시 일반 지식도 활용합니다.")
@@ -211,47 +314,64 @@ if st.session_state.selected:
                 st.markdown(prompt)
 
             with st.chat_message("assistant"):
-                with st.spinner("답변 생성 중..."):
-                    stt = item.get("video_stt_url") or ""
+                with st.spinner("관련 구간 찾는 중..."):
+                    stt = fetch_transcript(item["id"])
                     summary = item.get("summary_text") or ""
                     title = item.get("title") or ""
 
+                    # 질문과 관련된 STT 구간만 검색해서 프롬프트에 넣음 (인덱스 실패 시 앞부분 사용)
+                    try:
+                        chunks = []
+                        if stt:
+                            ensure_chunk_index(item["id"], stt)
+                            chunks = retrieve_chunks(item["id"], prompt)
+                        stt_context = "\n\n".join(f"[구간 {c['idx'] + 1}]\n{c['content']}" for c in chunks)
+                    except Exception as e:
+                        print(f"STT 검색 오류: {e}")
+                        stt_context = stt[:8000]
+
                     system_prompt = f"""당신은 유튜브 영상 '{title}'의 내용 전문가입니다.
-아래 영상의 전체 스크립트(STT)와 요약을 기반으로 사용자 질문에 답변하세요.
+아래 영상 요약과 질문과 관련된 스크립트(STT) 구간을 기반으로 사용자 질문에 답변하세요.
 STT 내용에 없는 질문은 일반 지식을 활용해 답변하되, STT 기반 답변임을 우선시하세요.
 항상 한국어로 답변하세요.
 
 [영상 요약]
 {summary[:2000]}
 
-[전체 STT]
-{stt[:8000]}
+[관련 STT 구간]
+{stt_context}
 """
-                    import requests as req
                     messages = [{"role": "system", "content": system_prompt}]
                     messages += [{"role": m["role"], "content": m["content"]}
                                  for m in st.session_state[chat_key]]
 
-                    resp = req.post(
-                        "https://api.openai.com/v1/chat/completions",
-                        headers={
-                            "Authorization": f"Bearer {st.secrets['openai']['api_key']}",
-                            "Content-Type": "application/json",
-                        },
-                        json={
-                            "model": "gpt-4o",
-                            "max_tokens": 1024,
-                            "messages": messages,
-                        },
-                        timeout=30,
-                    )
-                    resp_json = resp.json()
-                    if "choices" in resp_json:
-                        answer = resp_json["choices"][0]["message"]["content"]
-                    else:
-                        answer = f"❌ API 오류: {resp_json.get('error', {}).get('message', str(resp_json))}"
+                # 첫 토큰부터 바로 표시
+                try:
+                    answer = st.write_stream(stream_chat(messages))
+                except openai.APITimeoutError:
+                    answer = "❌ 응답 시간이 초과됐어요. 잠시 후 다시 시도해주세요."
                     st.markdown(answer)
-                    st.session_state[chat_key].append({"role": "assistant", "content": answer})
+                except openai.APIError as e:
+                    answer = f"❌ API 오류: {getattr(e, 'message', None) or e}"
+                    st.markdown(answer)
+                st.session_state[chat_key].append({"role": "assistant", "content": answer})
+
+    # ── 관련 영상 ──
+    related = fetch_related(item, k=COLS)
+    if related:
+        st.markdown("---")
+        st.markdown("#### 🔗 관련 영상")
+        my_tags = set(item.get("tags") or [])
+        for col, rel in zip(st.columns(COLS, gap="medium"), related):
+            with col:
+                thumb = rel.get("thumbnail_grid_url") or rel.get("thumbnail_url", "")
+                if thumb:
+                    st.image(thumb, use_container_width=True)
+                shared = [t for t in rel.get("tags") or [] if t in my_tags]
+                st.caption(" ".join(f"#{t}" for t in shared))
+                if st.button(rel.get("title") or "제목 없음", key=f"rel_{rel['id']}", use_container_width=True):
+                    st.session_state.selected = rel["id"]
+                    st.rerun()
     st.stop()
 
 # ── 사이드바 ─────────────────────────────────────────
@@ -260,11 +380,15 @@ with st.sidebar:
     st.markdown("---")
     st.radio("메뉴", ["🏠 홈", "🔖 태그 탐색", "⚙️ 설정"], label_visibility="collapsed")
     st.markdown("---")
-    search_q = st.text_input("🔍 제목 검색", placeholder="검색어 입력...")
+    search_q = st.text_input("🔍 검색 (제목·요약·스크립트)", placeholder="검색어 입력...").strip()
     all_tags = fetch_all_tags()
     selected_tag = ""
     if all_tags:
-        tag_choice = st.selectbox("🏷️ 태그 필터", ["전체"] + all_tags)
+        tag_counts = dict(all_tags)
+        tag_choice = st.selectbox(
+            "🏷️ 태그 필터", ["전체"] + [t for t, _ in all_tags],
+            format_func=lambda t: t if t == "전체" else f"{t} ({tag_counts[t]})",
+        )
         selected_tag = "" if tag_choice == "전체" else tag_choice
     st.markdown("---")
 
@@ -278,16 +402,71 @@ if search_q != st.session_state.prev_search or selected_tag != st.session_state.
     st.session_state.prev_tag = selected_tag
 
 # ── 데이터 로드 ──────────────────────────────────────
-data, total = fetch_summaries(st.session_state.page, search_q, selected_tag)
-total_pages = max(1, math.ceil((total or 0) / PAGE_SIZE))
+if "cursors" not in st.session_state:
+    st.session_state.cursors = {}
+if "exact_counts" not in st.session_state:
+    st.session_state.exact_counts = {}
+page = st.session_state.page
+
+if search_q:
+    # 검색 결과는 순위순이라 키셋 대신 offset (결과 집합이 작음)
+    wait_prefetch(search_summaries, search_q, selected_tag, page)
+    data, total = search_summaries(search_q, selected_tag, page)
+    has_next = page * PAGE_SIZE < total
+    if has_next:
+        prefetch(search_summaries, search_q, selected_tag, page + 1)
+    exact_total = total
+    total_pages = max(1, math.ceil(total / PAGE_SIZE))
+else:
+    # 페이지별 시작 cursor를 태그마다 기억 → 이전/다음/번호 이동 모두 키셋으로 처리
+    cursors = st.session_state.cursors.setdefault(selected_tag, {1: None})
+
+    def page_cursor(page: int):
+        if page not in cursors:
+            known = max(p for p in cursors if p < page)
+            cursors[page] = skip_rows(cursors[known], (page - known) * PAGE_SIZE, selected_tag)
+        return cursors[page]
+
+    cursor = page_cursor(page)
+    wait_prefetch(fetch_summaries, cursor, selected_tag)
+    data, has_next = fetch_summaries(cursor, selected_tag)
+    if data:
+        cursors[page + 1] = (data[-1]["created_at"], data[-1]["id"])
+    if has_next:
+        # 사용자가 현재 페이지를 보는 동안 다음 페이지를 미리 캐시
+        prefetch(fetch_summaries, cursors[page + 1], selected_tag)
+
+    exact_total = st.session_state.exact_counts.get(selected_tag)
+    total = exact_total if exact_total is not None else count_summaries(selected_tag)
+    # 추정치가 틀려도 현재 페이지/다음 페이지 존재 여부는 실제 조회 결과를 따름
+    total_pages = max(page + (1 if has_next else 0), math.ceil((total or 0) / PAGE_SIZE), 1)
+    if not has_next:
+        # 마지막 페이지에 도달하면 정확한 개수를 계산 없이 알 수 있음
+        total_pages = page
+        total = (page - 1) * PAGE_SIZE + len(data)
+
+if not data and page > 1:
+    # 추정 개수로 만든 페이지 번호가 실제보다 뒤였던 경우
+    st.session_state.page = 1
+    st.rerun()
 
 # ── 헤더 ─────────────────────────────────────────────
 st.markdown("### 📺 나의 유튜브 요약 대시보드")
-st.caption(f"총 {total or 0}개의 요약 · {st.session_state.page}/{total_pages} 페이지")
+hdr_caption, hdr_count = st.columns([6, 1])
+with hdr_caption:
+    approx = "" if exact_total is not None or not has_next else "약 "
+    st.caption(f"총 {approx}{total or 0}개의 요약 · {page}/{total_pages} 페이지")
+with hdr_count:
+    if exact_total is None and has_next:
+        if st.button("정확한 개수", key="exact_count"):
+            st.session_state.exact_counts[selected_tag] = count_summaries(selected_tag, exact=True)
+            st.rerun()
 st.markdown("---")
 
 # ── 카드 그리드 ──────────────────────────────────────
-if not data:
+if not data and search_q:
+    st.info(f"'{search_q}'에 대한 검색 결과가 없습니다.")
+elif not data:
     st.info("저장된 요약이 없습니다. 텔레그램 봇에 유튜브 링크를 보내보세요! 🚀")
 else:
     for row_idx in range(ROWS):
@@ -298,7 +477,8 @@ else:
                 break
             item = data[item_idx]
             with cols[col_idx]:
-                thumb = item.get("thumbnail_url", "")
+                # 그리드용 작은 WebP가 있으면 그것을 (없으면 예전 행의 원본 URL)
+                thumb = item.get("thumbnail_grid_url") or item.get("thumbnail_url", "")
                 title = item.get("title") or "제목 없음"
                 tags  = item.get("tags") or []
                 date  = (item.get("created_at") or "")[:10]
@@ -306,7 +486,7 @@ else:
                 source = item.get("source_type", "youtube")
                 thumb_icon = "🎬" if source == "youtube" else "📸"
                 thumb_html = (
-                    f'<img class="yt-thumb" src="{thumb}" onerror="this.style.display=\'none\';this.nextElementSibling.style.display=\'flex\'">'
+                    f'<img class="yt-thumb" src="{thumb}" loading="lazy" onerror="this.style.display=\'none\';this.nextElementSibling.style.display=\'flex\'">'
                     f'<div class="yt-thumb-placeholder" style="display:none;">{thumb_icon}</div>'
                     if thumb else
                     f'<div class="yt-thumb-placeholder">{thumb_icon}</div>'
@@ -315,6 +495,10 @@ else:
                 badge = "🎬" if source == "youtube" else "📸"
                 badge_color = "#ff0000" if source == "youtube" else "#833ab4"
                 tags_html = "".join(f'<span class="yt-tag">#{t}</span>' for t in tags[:5])
+                snippet_html = (
+                    f'<div class="yt-snippet">{highlight(item["snippet"], search_q)}</div>'
+                    if item.get("snippet") else ""
+                )
 
                 st.markdown(f"""
                 <div class="yt-card">
@@ -324,6 +508,7 @@ else:
                             <span style="background:{badge_color}; color:white; font-size:0.65rem; padding:2px 6px; border-radius:10px;">{badge} {'YouTube' if source == 'youtube' else 'Instagram'}</span>
                         </div>
                         <div class="yt-title">{title}</div>
+                        {snippet_html}
                         <div class="yt-tags">{tags_html}</div>
                         <div class="yt-date">📅 {date}</div>
                     </div>
@@ -333,7 +518,7 @@ else:
                 col_detail, col_del = st.columns([3, 1])
                 with col_detail:
                     if st.button("자세히 보기", key=f"btn_{item['id']}", use_container_width=True):
-                        st.session_state.selected = item
+                        st.session_state.selected = item["id"]
                         st.rerun()
                 with col_del:
                     if st.button("🗑️", key=f"del_{item['id']}", use_container_width=True):
@@ -372,6 +557,6 @@ if total_pages > 1:
                     st.session_state.page = pg
                     st.rerun()
     with pg_cols[2]:
-        if st.button("다음 ▶", disabled=st.session_state.page >= total_pages):
+        if st.button("다음 ▶", disabled=not has_next):
             st.session_state.page += 1
             st.rerun()
@@ -0,0 +1,117 @@
+import os, time, argparse
+from concurrent.futures import ThreadPoolExecutor
+from supabase import create_client
+from transcripts import clean_transcript, compress_transcript, load_transcript, save_transcript
+
+# ── 기존 행의 인라인 스크립트(video_stt_url) → summary_transcripts 압축 저장 ──
+# sql/007 적용 후 한 번 실행. save_transcript가 옮긴 행의 video_stt_url을 비우므로
+# 중간에 멈춰도 다시 실행하면 남은 행부터 이어서 처리됨
+# 유튜브 자막은 옮기면서 한 번 정리(clean_transcript)함. 인스타그램 캡션은 사용자가 쓴 글이라 그대로
+#   python backfill_transcripts.py --batch 100 --workers 4
+#   python backfill_transcripts.py --dry-run   # 압축률만 확인
+#   python backfill_transcripts.py --reclean   # 정리 도입 전에 이미 옮긴 유튜브 스크립트만 정리해 다시 저장
+
+
+def legacy_text(row: dict, text: str) -> str:
+    # 자막 정리 도입 전에 저장된 유튜브 스크립트 (봇이 새로 저장하는 것은 이미 정리됨)
+    if (row.get("source_type") or "youtube") != "youtube":
+        return text
+    return clean_transcript([(None, text)])["text"]
+
+
+def reclean(client, args):
+    """summary_transcripts로 이미 옮긴 유튜브 스크립트를 정리해 다시 저장 (id 순, 바뀐 것만)"""
+    after, seen, changed = args.after, 0, 0
+    start = time.time()
+
+    def clean_one(row: dict) -> bool:
+        text = load_transcript(client, row["id"])
+        if not text:
+            return False
+        cleaned = legacy_text(row, text)
+        if cleaned == text:
+            return False
+        save_transcript(client, row["id"], cleaned)  # 타임스탬프는 기존 값 유지
+        return True
+
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        while True:
+            query = (
+                client.table("youtube_summaries")
+                .select("id, source_type")
+                .or_("source_type.eq.youtube,source_type.is.null")
+                .order("id")
+                .limit(args.batch)
+            )
+            if after:
+                query = query.gt("id", after)
+            rows = query.execute().data
+            if not rows:
+                break
+            changed += sum(pool.map(clean_one, rows))
+            seen += len(rows)
+            after = rows[-1]["id"]
+            print(f"{seen}행 확인 · {changed}행 정리 · 마지막 id {after} · {time.time() - start:.0f}초")
+
+    print(f"완료: {seen}행 중 {changed}행 정리")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="video_stt_url → summary_transcripts 백필")
+    parser.add_argument("--batch", type=int, default=100, help="한 번에 읽을 행 수")
+    parser.add_argument("--workers", type=int, default=4, help="동시 저장 수")
+    parser.add_argument("--dry-run", action="store_true", help="저장 없이 첫 배치의 압축률만 출력")
+    parser.add_argument("--reclean", action="store_true", help="이미 옮긴 유튜브 스크립트를 정리해 다시 저장")
+    parser.add_argument("--after", help="--reclean을 이 id 다음부터 (중단된 실행 이어서)")
+    args = parser.parse_args()
+
+    client = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_KEY"])
+    if args.reclean:
+        reclean(client, args)
+        return
+    moved = raw_total = stored_total = 0
+    start = time.time()
+
+    def move(row: dict) -> dict:
+        text = row["video_stt_url"]
+        if not text:
+            client.table("youtube_summaries").update({"video_stt_url": None}).eq("id", row["id"]).execute()
+            return {"raw_bytes": 0, "stored_bytes": 0}
+        return save_transcript(client, row["id"], legacy_text(row, text))
+
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        while True:
+            # 옮긴 행은 video_stt_url이 null이 되므로 offset 없이 매번 처음부터
+            rows = (
+                client.table("youtube_summaries")
+                .select("id, source_type, video_stt_url")
+                .not_.is_("video_stt_url", "null")
+                .order("id")
+                .limit(args.batch)
+                .execute()
+                .data
+            )
+            if not rows:
+                break
+            if args.dry_run:
+                for row in rows:
+                    raw = len((row["video_stt_url"] or "").encode("utf-8"))
+                    _, data = compress_transcript(legacy_text(row, row["video_stt_url"] or ""))
+                    raw_total += raw
+                    stored_total += len(data)
+                print(f"[dry-run] {len(rows)}행: {raw_total:,}B → {stored_total:,}B "
+                      f"({stored_total / max(raw_total, 1):.1%})")
+                return
+
+            for stats in pool.map(move, rows):
+                raw_total += stats["raw_bytes"]
+                stored_total += stats["stored_bytes"]
+            moved += len(rows)
+            print(f"{moved}행 이동 · {raw_total:,}B → {stored_total:,}B "
+                  f"({stored_total / max(raw_total, 1):.1%}) · {time.time() - start:.0f}초")
+
+    print(f"완료: {moved}행")
+
+
+if __name__ == "__main__":
+    main()
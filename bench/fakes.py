@@ -0,0 +1,553 @@
+import io, json, base64, random, re, threading, time, uuid
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qsl, unquote
+
+# ── 벤치마크용 가짜 외부 서비스 ──────────────────────
+# Apify / OpenAI / Supabase(PostgREST·Storage) / Telegram / 썸네일 CDN을
+# 같은 프로세스의 로컬 HTTP 서버로 흉내냄. 실제 클라이언트 라이브러리(httpx, requests,
+# supabase-py, python-telegram-bot)가 그대로 요청을 보내므로 직렬화·커넥션 비용까지 측정됨
+
+
+class Behavior:
+    """서비스별 응답 특성. payload는 서비스마다 의미가 다름 (아래 각 클래스 참고)"""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.2, error_rate: float = 0.0,
+                 payload: int = 0, throughput: float = 0.0):
+        self.latency = latency        # 초, 요청당 기본 지연 (스트리밍이면 첫 토큰까지)
+        self.jitter = jitter          # latency의 ±비율
+        self.error_rate = error_rate  # 0~1, 이 확률로 5xx 응답
+        self.payload = payload
+        self.throughput = throughput  # 글자/초, 생성형 응답의 출력 속도 (0이면 즉시)
+
+    def delay(self) -> float:
+        return max(0.0, self.latency * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+
+def filler(chars: int, seed: int = 0) -> str:
+    # 자동 자막 비슷한 한국어 문장 반복 (seed로 항목마다 조금씩 다르게)
+    words = ["오늘은", "이 영상에서", "정말", "중요한", "부분을", "같이", "살펴볼게요", "그러니까",
+             "데이터를", "보면", "결과가", "이렇게", "나오는데요", "다음으로", "넘어가서", "핵심은"]
+    rnd = random.Random(seed)
+    out, n = [], 0
+    while n < chars:
+        sent = " ".join(rnd.choice(words) for _ in range(rnd.randint(5, 12))) + "."
+        out.append(sent)
+        n += len(sent) + 1
+    return " ".join(out)[:chars]
+
+
+class FakeServer:
+    name = "fake"
+
+    def __init__(self, behavior: Behavior = None):
+        self.behavior = behavior or Behavior()
+        self.requests = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+        self.httpd = None
+        self.url = ""
+
+    def start(self):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(self))
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True, name=self.name).start()
+        return self
+
+    def stop(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+
+    def stats(self) -> dict:
+        return {"requests": self.requests, "errors": self.errors}
+
+    def route(self, method: str, path: str, query: list, headers, body: bytes):
+        """→ (status, headers, body). body가 list면 [(지연초, bytes), ...] 순서로 chunked 스트리밍"""
+        return 404, {}, b"not found"
+
+
+def make_handler(server: FakeServer):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive → 실제 서비스처럼 커넥션 재사용
+
+        def handle_any(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+            url = urlsplit(self.path)
+            with server.lock:
+                server.requests += 1
+            time.sleep(server.behavior.delay())
+            if random.random() < server.behavior.error_rate:
+                with server.lock:
+                    server.errors += 1
+                status, headers, out = 503, {"Content-Type": "application/json"}, b'{"error": "fake outage"}'
+            else:
+                status, headers, out = server.route(
+                    self.command, unquote(url.path), parse_qsl(url.query, keep_blank_values=True), self.headers, body,
+                )
+            self.send_response(status)
+            for k, v in headers.items():
+                self.send_header(k, v)
+            if isinstance(out, list):
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for wait, chunk in out:
+                    if wait:
+                        time.sleep(wait)
+                    self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+            else:
+                self.send_header("Content-Length", str(len(out)))
+                self.end_headers()
+                self.wfile.write(out)
+
+        do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = handle_any
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def json_response(data, status: int = 200, headers: dict = None):
+    return status, {"Content-Type": "application/json", **(headers or {})}, json.dumps(data, ensure_ascii=False).encode()
+
+
+def read_json(body: bytes):
+    try:
+        return json.loads(body or b"null")
+    except ValueError:
+        return None
+
+
+# ── Apify ────────────────────────────────────────────
+class FakeApify(FakeServer):
+    """run-sync-get-dataset-items. payload = YouTube 트랜스크립트 글자 수 (인스타그램 캡션은 1/10)"""
+    name = "apify"
+
+    def __init__(self, behavior: Behavior = None, cdn_url: str = ""):
+        super().__init__(behavior or Behavior(latency=2.0, payload=20000))
+        self.cdn_url = cdn_url
+
+    def route(self, method, path, query, headers, body):
+        m = re.match(r"/v2/acts/([^/]+)/run-sync-get-dataset-items", path)
+        data = read_json(body) or {}
+        if not m:
+            return super().route(method, path, query, headers, body)
+        if "youtube-transcripts" in m.group(1):
+            items = []
+            for url in data.get("urls", []):
+                text = filler(self.behavior.payload, seed=hash(url))
+                # 실제 액터처럼 짧은 자막 조각 목록으로
+                items.append({"url": url, "captions": [text[i:i + 40] for i in range(0, len(text), 40)]})
+            return json_response(items)
+        if "instagram-scraper" in m.group(1):
+            items = []
+            for url in data.get("directUrls", []):
+                code = re.search(r"/(?:p|reel|reels|tv)/([^/?#]+)", url)
+                code = code.group(1) if code else url
+                items.append({
+                    "shortCode": code,
+                    "caption": filler(max(200, self.behavior.payload // 10), seed=hash(code)),
+                    "displayUrl": f"{self.cdn_url}/ig/{code}.jpg",
+                    "ownerUsername": "bench",
+                    "likesCount": 1,
+                })
+            return json_response(items)
+        return json_response([])
+
+
+# ── OpenAI ───────────────────────────────────────────
+class FakeOpenAI(FakeServer):
+    """chat.completions(스트리밍 포함) / audio.transcriptions / embeddings. payload = 요약 글자 수"""
+    name = "openai"
+
+    def __init__(self, behavior: Behavior = None):
+        super().__init__(behavior or Behavior(latency=0.8, payload=1500, throughput=400))
+        self.tokens = {}  # model → [prompt, completion]
+
+    def summary(self, seed: int) -> str:
+        rnd = random.Random(seed)
+        tags = rnd.sample(TAG_POOL[:40], 4)
+        head = (
+            f"## 🚀 벤치마크 영상 {seed % 100000}\n\n### 핵심 메시지\n- {filler(60, seed)}\n\n"
+        )
+        tail = f"\n\n[TAGS] {', '.join(tags)}"
+        return head + filler(max(0, self.behavior.payload - len(head) - len(tail)), seed + 1) + tail
+
+    def record(self, model: str, prompt: int, completion: int):
+        with self.lock:
+            t = self.tokens.setdefault(model, [0, 0])
+            t[0] += prompt
+            t[1] += completion
+
+    def stats(self) -> dict:
+        return {**super().stats(), "tokens": self.tokens}
+
+    def route(self, method, path, query, headers, body):
+        if path.endswith("/chat/completions"):
+            return self.chat(read_json(body) or {})
+        if path.endswith("/audio/transcriptions"):
+            return json_response({"text": filler(self.behavior.payload)})
+        if path.endswith("/embeddings"):
+            data = read_json(body) or {}
+            inputs = data.get("input") or []
+            inputs = [inputs] if isinstance(inputs, str) else inputs
+            vecs = [{"object": "embedding", "index": i, "embedding": [random.random() for _ in range(1536)]}
+                    for i in range(len(inputs))]
+            return json_response({"object": "list", "data": vecs, "model": data.get("model", ""),
+                                  "usage": {"prompt_tokens": 0, "total_tokens": 0}})
+        return super().route(method, path, query, headers, body)
+
+    def chat(self, data: dict):
+        model = data.get("model", "gpt-4o")
+        prompt = "".join(str(m.get("content", "")) for m in data.get("messages", []))
+        text = self.summary(hash(prompt[-200:]))
+        # 한국어는 대략 1~2글자당 1토큰
+        usage = {"prompt_tokens": len(prompt) // 2, "completion_tokens": len(text) // 2}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        self.record(model, usage["prompt_tokens"], usage["completion_tokens"])
+        base = {"id": f"chatcmpl-{uuid.uuid4().hex[:12]}", "created": int(time.time()), "model": model}
+        rate = self.behavior.throughput
+
+        if not data.get("stream"):
+            if rate:
+                time.sleep(len(text) / rate)
+            return json_response({
+                **base, "object": "chat.completion", "usage": usage,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            })
+
+        def event(obj) -> bytes:
+            return f"data: {json.dumps(obj, ensure_ascii=False)}\n\n".encode()
+
+        step = 20  # 청크당 글자 수
+        chunks = [
+            (step / rate if rate else 0, event({
+                **base, "object": "chat.completion.chunk",
+                "choices": [{"index": 0, "delta": {"content": text[i:i + step]}, "finish_reason": None}],
+            }))
+            for i in range(0, len(text), step)
+        ]
+        chunks.append((0, event({**base, "object": "chat.completion.chunk", "choices": [
+            {"index": 0, "delta": {}, "finish_reason": "stop"}]})))
+        if (data.get("stream_options") or {}).get("include_usage"):
+            chunks.append((0, event({**base, "object": "chat.completion.chunk", "choices": [], "usage": usage})))
+        chunks.append((0, b"data: [DONE]\n\n"))
+        return 200, {"Content-Type": "text/event-stream"}, chunks
+
+
+# ── Supabase (PostgREST + Storage) ───────────────────
+TAG_POOL = [f"태그{i:03d}" for i in range(200)]
+
+
+def unquote_value(v: str) -> str:
+    return v[1:-1] if len(v) >= 2 and v[0] == v[-1] == '"' else v
+
+
+class FakeSupabase(FakeServer):
+    """youtube_summaries / tag_counts 테이블을 메모리에 두고 필요한 PostgREST 문법만 해석.
+    목록은 (created_at, id) 정렬 인덱스와 태그별 인덱스로 처리 → 가짜 서버 자체 비용은 작게"""
+    name = "supabase"
+
+    def __init__(self, behavior: Behavior = None):
+        super().__init__(behavior or Behavior(latency=0.03))
+        self.rows = {}        # id → row
+        self.order = []       # (created_at, id) 오름차순
+        self.tag_index = {}   # tag → (created_at, id) 오름차순
+        self.by_key = {}      # content_key → id 목록
+        self.transcripts = {} # summary_id → (encoding, base64) — summary_transcripts 테이블
+        self.uploads = 0
+        self.upload_bytes = 0
+
+    # 데이터 ─────────────────────────────
+    def _add(self, row: dict):
+        key = (row["created_at"], row["id"])
+        self.rows[row["id"]] = row
+        insort(self.order, key)
+        for tag in row.get("tags") or []:
+            insort(self.tag_index.setdefault(tag, []), key)
+        if row.get("content_key"):
+            self.by_key.setdefault(row["content_key"], []).append(row["id"])
+
+    def _remove(self, row_id: str):
+        row = self.rows.pop(row_id, None)
+        if not row:
+            return
+        key = (row["created_at"], row["id"])
+        self.order.pop(bisect_left(self.order, key))
+        for tag in row.get("tags") or []:
+            index = self.tag_index[tag]
+            index.pop(bisect_left(index, key))
+        if row.get("content_key"):
+            self.by_key[row["content_key"]].remove(row_id)
+
+    def seed(self, n: int, transcript_chars: int = 20000, summary_chars: int = 1500):
+        """n개 행 생성. 큰 텍스트는 같은 문자열 객체를 공유해 메모리는 작게, 응답 크기는 실제처럼"""
+        from transcripts import compress_transcript
+        encoding, data = compress_transcript(filler(transcript_chars, 1))
+        transcript = (encoding, base64.b64encode(data).decode("ascii"))
+        summary = filler(summary_chars, 2)
+        now = datetime.now(timezone.utc)
+        rnd = random.Random(42)
+        weights = [1 / (i + 1) for i in range(len(TAG_POOL))]  # 자주 쓰는 태그가 몰리도록
+        with self.lock:
+            for i in range(n):
+                created = now - timedelta(seconds=rnd.uniform(0, 2 * 365 * 86400))
+                row_id = str(uuid.UUID(int=rnd.getrandbits(128), version=4))
+                youtube = rnd.random() < 0.8
+                self._add({
+                    "id": row_id,
+                    "created_at": created.isoformat(),
+                    "title": f"시드 영상 {i}",
+                    "summary_text": summary,
+                    "tags": list(dict.fromkeys(rnd.choices(TAG_POOL, weights, k=rnd.randint(2, 5)))),
+                    "source_type": "youtube" if youtube else "instagram",
+                    "content_key": f"{'yt' if youtube else 'ig'}:seed{i}",
+                    "youtube_url": f"https://www.youtube.com/watch?v=seed{i}",
+                    "thumbnail_url": f"https://example.invalid/{row_id}/detail.webp",
+                    "thumbnail_grid_url": f"https://example.invalid/{row_id}/grid.webp",
+                })
+                self.transcripts[row_id] = transcript
+
+    def tag_counts(self) -> list:
+        return [{"tag": t, "count": len(ids)} for t, ids in sorted(self.tag_index.items()) if ids]
+
+    def stats(self) -> dict:
+        return {**super().stats(), "rows": len(self.rows), "uploads": self.uploads, "upload_bytes": self.upload_bytes}
+
+    # PostgREST ──────────────────────────
+    def route(self, method, path, query, headers, body):
+        if path.startswith("/storage/v1/object/"):
+            with self.lock:
+                self.uploads += 1
+                self.upload_bytes += len(body)
+            return json_response({"Key": path[len("/storage/v1/object/"):]})
+        if path.startswith("/rest/v1/rpc/"):
+            return self.rpc(path[len("/rest/v1/rpc/"):], read_json(body) or {})
+        m = re.match(r"/rest/v1/(\w+)$", path)
+        if not m:
+            return json_response({"message": f"fake: {path} 미지원"}, 404)
+        table = m.group(1)
+        with self.lock:
+            if table == "tag_counts":
+                return self.select(self.tag_counts(), query, headers)
+            if table != "youtube_summaries":
+                return json_response({"message": f"fake: {table} 미지원"}, 404)
+            if method == "GET":
+                return self.select_summaries(query, headers)
+            if method == "POST":
+                data = read_json(body)
+                inserted = []
+                for row in data if isinstance(data, list) else [data]:
+                    row = {
+                        "id": str(uuid.uuid4()),
+                        "created_at": datetime.now(timezone.utc).isoformat(),
+                        **row,
+                    }
+                    self._add(row)
+                    inserted.append(row)
+                return json_response(inserted, 201)
+            matched = [r for r in self.rows.values() if self.matches(r, query)]
+            if method == "PATCH":
+                data = read_json(body) or {}
+                for row in matched:
+                    self._remove(row["id"])
+                    row.update(data)
+                    self._add(row)
+                return json_response(matched)
+            if method == "DELETE":
+                for row in matched:
+                    self._remove(row["id"])
+                    self.transcripts.pop(row["id"], None)  # on delete cascade
+                return json_response(matched)
+        return json_response({"message": "fake: 미지원 요청"}, 400)
+
+    def rpc(self, name: str, args: dict):
+        with self.lock:
+            if name == "save_transcript":
+                self.transcripts[args["p_summary_id"]] = (args["p_encoding"], args["p_data"])
+                row = self.rows.get(args["p_summary_id"])
+                if row:
+                    row["video_stt_url"] = None
+                return json_response(None)
+            if name == "update_summaries":
+                changed = 0
+                for update in args["p_rows"]:
+                    row = self.rows.get(update["id"])
+                    new = {k: v for k, v in update.items() if k != "id" and v is not None}
+                    if row and any(row.get(k) != v for k, v in new.items()):
+                        self._remove(row["id"])
+                        row.update(new)
+                        self._add(row)
+                        changed += 1
+                return json_response(changed)
+            if name == "get_transcript":
+                stored = self.transcripts.get(args["p_summary_id"])
+                return json_response([{"encoding": stored[0], "data": stored[1]}] if stored else [])
+        return json_response({"message": f"fake: rpc {name} 미지원"}, 404)
+
+    def matches(self, row: dict, query: list) -> bool:
+        for col, expr in query:
+            if col in ("select", "order", "limit", "offset", "or") or "." not in expr:
+                continue
+            op, _, val = expr.partition(".")
+            have = row.get(col)
+            if op == "eq" and str(have) != unquote_value(val):
+                return False
+            if op == "in" and str(have) not in [unquote_value(v) for v in val.strip("()").split(",")]:
+                return False
+            if op == "cs" and not set(v.strip('"') for v in val.strip("{}").split(",")) <= set(have or []):
+                return False
+            if op in ("gt", "lt"):
+                try:
+                    have, val = float(have), float(val)
+                except (TypeError, ValueError):
+                    pass
+                if (op == "gt" and not have > val) or (op == "lt" and not have < val):
+                    return False
+        return True
+
+    def select_summaries(self, query: list, headers):
+        params = dict(query)
+        limit = int(params.get("limit", 1000))
+        offset = int(params.get("offset", 0))
+        counting = "count=" in (headers.get("Prefer") or "")
+        if params.get("id", "").startswith("eq."):
+            row = self.rows.get(unquote_value(params["id"][3:]))
+            candidates = [r for r in [row] if r and self.matches(r, query)]
+            return self.respond(candidates, params, headers, offset, limit, len(candidates))
+        if params.get("content_key", "").startswith("in."):
+            keys = [unquote_value(v) for v in params["content_key"][3:].strip("()").split(",")]
+            candidates = [self.rows[i] for k in keys for i in self.by_key.get(k, [])]
+            candidates.sort(key=lambda r: (r["created_at"], r["id"]), reverse=True)
+            candidates = [r for r in candidates if self.matches(r, query)]
+            return self.respond(candidates, params, headers, offset, limit, len(candidates))
+
+        # 목록: 전체 또는 태그별 정렬 인덱스를 뒤에서부터 (created_at desc, id desc)
+        index = self.order
+        tag = params.get("tags", "")
+        if tag.startswith("cs."):
+            index = self.tag_index.get(tag[3:].strip("{}").split(",")[0].strip('"'), [])
+        end = len(index)
+        # 키셋 cursor: or=(created_at.lt."…",and(created_at.eq."…",id.lt.…))
+        cursor = re.search(r'created_at\.lt\."([^"]+)".*id\.lt\.([^)]+)\)', params.get("or", ""))
+        if cursor:
+            end = bisect_left(index, (cursor.group(1), cursor.group(2)))
+        # 인덱스로 다 걸러지는 조건이면 개수는 위치로 바로 계산
+        indexed = all(k in ("select", "order", "limit", "offset", "or", "tags") for k, _ in query)
+        candidates = []
+        for i in range(end - 1, -1, -1):
+            row = self.rows[index[i][1]]
+            if self.matches(row, query):
+                candidates.append(row)
+                if len(candidates) >= offset + limit and (indexed or not counting):
+                    break
+        total = end if indexed else len(candidates)
+        return self.respond(candidates, params, headers, offset, limit, total)
+
+    def select(self, rows: list, query: list, headers):
+        params = dict(query)
+        rows = [r for r in rows if self.matches(r, query)]
+        return self.respond(rows, params, headers, int(params.get("offset", 0)), int(params.get("limit", 1000)), len(rows))
+
+    def respond(self, rows: list, params: dict, headers, offset: int, limit: int, total: int):
+        page = rows[offset:offset + limit]
+        columns = [c.strip() for c in params.get("select", "*").split(",")]
+        if "*" not in columns:
+            page = [{c: r.get(c) for c in columns} for r in page]
+        extra = {}
+        if "count=" in (headers.get("Prefer") or ""):
+            extra["Content-Range"] = f"{offset}-{offset + max(len(page) - 1, 0)}/{total}"
+        return json_response(page, headers=extra)
+
+
+# ── Telegram Bot API ─────────────────────────────────
+class FakeTelegram(FakeServer):
+    """/bot<token>/<method>. 보낸/수정한 메시지를 시각과 함께 기록해 응답 지연 계산에 사용"""
+    name = "telegram"
+
+    def __init__(self, behavior: Behavior = None):
+        super().__init__(behavior or Behavior(latency=0.05))
+        self.next_id = {}   # chat_id → 다음 message_id
+        self.events = []    # (time.time(), method, chat_id, message_id, text)
+
+    def route(self, method, path, query, headers, body):
+        m = re.match(r"/bot[^/]+/(\w+)$", path)
+        if not m:
+            return super().route(method, path, query, headers, body)
+        api = m.group(1)
+        ctype = headers.get("Content-Type") or ""
+        if "json" in ctype:
+            params = read_json(body) or {}
+        elif "urlencoded" in ctype:
+            params = dict(parse_qsl(body.decode()))
+        else:
+            params = {}
+        if api == "getMe":
+            return self.ok({"id": 1, "is_bot": True, "first_name": "bench", "username": "bench_bot"})
+        chat_id = int(params.get("chat_id") or 0)
+        text = params.get("text", "")
+        with self.lock:
+            if api == "sendMessage":
+                message_id = self.next_id.get(chat_id, 1_000_000)
+                self.next_id[chat_id] = message_id + 1
+            elif api == "editMessageText":
+                message_id = int(params.get("message_id") or 0)
+            else:
+                return self.ok(True)
+            self.events.append((time.time(), api, chat_id, message_id, text))
+        return self.ok({
+            "message_id": message_id, "date": int(time.time()), "text": text,
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": 1, "is_bot": True, "first_name": "bench"},
+        })
+
+    def ok(self, result):
+        return json_response({"ok": True, "result": result})
+
+
+# ── 썸네일 CDN (i.ytimg.com / 인스타그램 displayUrl) ──
+class FakeCDN(FakeServer):
+    """payload = 이미지 한 변 픽셀 수 기준 (기본 1280×720 JPEG)"""
+    name = "cdn"
+
+    def __init__(self, behavior: Behavior = None):
+        super().__init__(behavior or Behavior(latency=0.05, payload=1280))
+        self._image = None
+
+    def image(self) -> bytes:
+        if self._image is None:
+            from PIL import Image
+            w = self.behavior.payload or 1280
+            # 노이즈 이미지: 단색은 JPEG가 너무 작아져 fetch_image의 최소 크기 검사에 걸림
+            im = Image.effect_noise((w, w * 9 // 16), 64).convert("RGB")
+            out = io.BytesIO()
+            im.save(out, "JPEG", quality=85)
+            self._image = out.getvalue()
+        return self._image
+
+    def route(self, method, path, query, headers, body):
+        if path.endswith(".jpg"):
+            with self.lock:
+                data = self.image()
+            return 200, {"Content-Type": "image/jpeg"}, data
+        return super().route(method, path, query, headers, body)
+
+
+def start_all(behaviors: dict = None) -> dict:
+    """서비스 이름 → 시작된 가짜 서버. behaviors로 서비스별 Behavior 덮어쓰기"""
+    behaviors = behaviors or {}
+    cdn = FakeCDN(behaviors.get("cdn")).start()
+    fakes = {
+        "cdn":      cdn,
+        "apify":    FakeApify(behaviors.get("apify"), cdn_url=cdn.url).start(),
+        "openai":   FakeOpenAI(behaviors.get("openai")).start(),
+        "supabase": FakeSupabase(behaviors.get("supabase")).start(),
+        "telegram": FakeTelegram(behaviors.get("telegram")).start(),
+    }
+    return fakes
@@ -0,0 +1,347 @@
+import argparse, asyncio, contextlib, json, logging, os, random, resource, string, sys, tempfile, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from bench.fakes import Behavior, start_all
+
+# ── 오프라인 벤치마크 ────────────────────────────────
+# 실제 API 대신 bench/fakes.py의 로컬 서버를 띄우고 bot.py / store.py를 그대로 구동
+#   python -m bench.run bot --links 200 --chats 10 --links-per-message 5
+#   python -m bench.run dashboard --rows 100000 --pages 20 --sessions 8
+#   python -m bench.run bot --latency apify=20 openai=3 --error-rate apify=0.1 --json after.json --baseline before.json
+# 결과: 처리량, p50/p95/p99 지연, 최대 메모리 → --json으로 저장해 실행 간 비교
+
+SERVICES = ("apify", "openai", "supabase", "telegram", "cdn")
+
+
+def is_final(text: str) -> bool:
+    # 링크 1개: 완료/실패 답장, 여러 개: 집계 메시지 첫 줄이 "… 처리 완료!"
+    return text.startswith(("✅ 요약 완료", "❌")) or text.split("\n", 1)[0].endswith("처리 완료!")
+
+
+def percentiles(samples: list) -> dict:
+    if not samples:
+        return {"n": 0}
+    s = sorted(samples)
+    pick = lambda q: s[min(len(s) - 1, int(q * len(s)))]
+    return {"n": len(s), "p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": s[-1]}
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Linux: KB
+
+
+def service_options(pairs: list, cast=float) -> dict:
+    """["apify=2", "openai=0.5"] → {"apify": 2.0, "openai": 0.5}"""
+    out = {}
+    for pair in pairs or []:
+        name, _, value = pair.partition("=")
+        if name not in SERVICES:
+            raise SystemExit(f"알 수 없는 서비스: {name} (가능: {', '.join(SERVICES)})")
+        out[name] = cast(value)
+    return out
+
+
+DEFAULT_LATENCY = {"apify": 2.0, "openai": 0.8, "supabase": 0.03, "telegram": 0.05, "cdn": 0.05}
+DEFAULT_PAYLOAD = {"apify": 20000, "openai": 1500, "supabase": 0, "telegram": 0, "cdn": 1280}
+
+
+def behaviors(args) -> dict:
+    latency = service_options(args.latency)
+    errors = service_options(args.error_rate)
+    payload = service_options(args.payload, int)
+    return {
+        name: Behavior(latency=latency.get(name, DEFAULT_LATENCY[name]),
+                       error_rate=errors.get(name, 0.0),
+                       payload=payload.get(name, DEFAULT_PAYLOAD[name]),
+                       throughput=args.openai_throughput if name == "openai" else 0.0)
+        for name in SERVICES
+    }
+
+
+def set_env(fakes: dict, queue_path: str):
+    # bot.py / store.py는 import 시점에 환경 변수를 읽으므로 import 전에 설정
+    os.environ.update({
+        "TELEGRAM_TOKEN":    "123456:bench",
+        "OPENAI_API_KEY":    "sk-bench",
+        "OPENAI_BASE_URL":   f"{fakes['openai'].url}/v1",
+        "SUPABASE_URL":      fakes["supabase"].url,
+        "SUPABASE_KEY":      "bench.bench.bench",
+        "APIFY_TOKEN":       "bench",
+        "APIFY_API_URL":     fakes["apify"].url,
+        "YOUTUBE_THUMB_URL": fakes["cdn"].url,
+        "QUEUE_PATH":        queue_path,
+        "TRANSCRIPT_HEDGE_DELAY": "3600",
+    })
+
+
+def random_id(n: int) -> str:
+    return "".join(random.choices(string.ascii_letters + string.digits + "_-", k=n))
+
+
+def synthetic_links(n: int, instagram_ratio: float, dup_ratio: float) -> list:
+    links = []
+    for _ in range(n):
+        if links and random.random() < dup_ratio:
+            links.append(random.choice(links))  # 중복 링크 → content_key 합류/캐시 경로
+        elif random.random() < instagram_ratio:
+            links.append(f"https://www.instagram.com/p/{random_id(11)}/")
+        else:
+            links.append(f"https://www.youtube.com/watch?v={random_id(11)}")
+    return links
+
+
+# ── 봇 인제스트 ──────────────────────────────────────
+async def bench_bot(args, fakes: dict) -> dict:
+    from telegram import Bot, Update
+    import bot
+    from jobqueue import DONE
+    from transcripts import HedgedFetcher
+
+    # yt-dlp 소스와 Whisper는 실제 YouTube에 접속하므로 제외 (Apify 실패 = 트랜스크립트 없음)
+    bot.transcript_fetcher = HedgedFetcher({"apify": bot.apify_source}, hedge_delay=bot.TRANSCRIPT_HEDGE_DELAY)
+
+    async def no_audio(video_url: str) -> str:
+        return ""
+    bot.transcribe_audio = no_audio
+
+    tg = Bot(os.environ["TELEGRAM_TOKEN"], base_url=f"{fakes['telegram'].url}/bot")
+    await tg.initialize()
+    await bot.start_workers(SimpleNamespace(bot=tg, create_task=asyncio.create_task))
+
+    links = synthetic_links(args.links, args.instagram_ratio, args.dup_ratio)
+    messages = [links[i:i + args.links_per_message] for i in range(0, len(links), args.links_per_message)]
+    ctx = SimpleNamespace(bot=tg)
+    ack = []
+
+    async def send(i: int, msg_links: list):
+        # burst마다 동시에, burst 사이에는 --interval초 간격
+        await asyncio.sleep((i // args.burst) * args.interval)
+        chat_id = 1 + i % args.chats
+        update = Update.de_json({
+            "update_id": i,
+            "message": {
+                "message_id": i + 1, "date": int(time.time()), "text": "\n".join(msg_links),
+                "chat": {"id": chat_id, "type": "private"},
+                "from": {"id": chat_id, "is_bot": False, "first_name": f"user{chat_id}"},
+            },
+        }, tg)
+        start = time.monotonic()
+        await bot.handle_message(update, ctx)
+        ack.append(time.monotonic() - start)
+
+    start = time.time()
+    await asyncio.gather(*(send(i, m) for i, m in enumerate(messages)))
+
+    # 큐가 빌 때까지 (썸네일 단계 포함) 대기
+    deadline = time.monotonic() + args.timeout
+    while time.monotonic() < deadline:
+        counts = bot.queue.counts()
+        if not any(counts.get(stage) for stage in bot.STAGES) and not bot._batch_renders:
+            break
+        await asyncio.sleep(0.2)
+    drained = time.time() - start
+    counts = bot.queue.counts()
+
+    # 배치(상태 메시지)별 최종 답장까지 걸린 시간
+    finals = {}
+    for at, _, chat_id, message_id, text in fakes["telegram"].events:
+        if is_final(text):
+            finals.setdefault((chat_id, message_id), at)
+    with bot.queue.lock:
+        batches = bot.queue.conn.execute("SELECT chat_id, message_id, created_at FROM batches").fetchall()
+        jobs = bot.queue.conn.execute(
+            "SELECT updated_at - created_at AS t FROM jobs WHERE stage = ?", (DONE,)
+        ).fetchall()
+    reply = [finals[(b["chat_id"], b["message_id"])] - b["created_at"]
+             for b in batches if (b["chat_id"], b["message_id"]) in finals]
+
+    for task in asyncio.all_tasks():
+        if task is not asyncio.current_task():
+            task.cancel()
+    await tg.shutdown()
+    bot.executor.shutdown(wait=False, cancel_futures=True)
+
+    return {
+        "links": len(links),
+        "messages": len(messages),
+        "seconds": drained,
+        "throughput_links_per_s": len(links) / drained if drained else 0,
+        "jobs": counts,
+        "unfinished": sum(counts.get(stage, 0) for stage in bot.STAGES),
+        "handler_ack_s": percentiles(ack),
+        "reply_s": percentiles(reply),
+        "replies_missing": len(batches) - len(reply),
+        "job_pipeline_s": percentiles([r["t"] for r in jobs]),
+    }
+
+
+# ── 대시보드 조회 ────────────────────────────────────
+def timed_calls(calls: list) -> list:
+    out = []
+    for fn in calls:
+        start = time.perf_counter()
+        fn()
+        out.append(time.perf_counter() - start)
+    return out
+
+
+def bench_dashboard(args, fakes: dict) -> dict:
+    logging.getLogger("streamlit").setLevel(logging.ERROR)  # 런타임 없이 캐시 사용 시 경고
+    import store
+
+    seed_start = time.perf_counter()
+    fakes["supabase"].seed(args.rows, transcript_chars=args.transcript_chars)
+    seeded = time.perf_counter() - seed_start
+    top_tag = max(fakes["supabase"].tag_counts(), key=lambda t: t["count"])["tag"]
+    rare_tag = min(fakes["supabase"].tag_counts(), key=lambda t: t["count"])["tag"]
+
+    def walk(tag: str, pages: int, clear: bool) -> list:
+        """키셋으로 pages 페이지를 차례로 넘기며 페이지별 fetch_summaries 시간"""
+        times, cursor = [], None
+        for _ in range(pages):
+            if clear:
+                store.fetch_summaries.clear()
+            start = time.perf_counter()
+            rows, has_next = store.fetch_summaries(cursor, tag)
+            times.append(time.perf_counter() - start)
+            if not has_next:
+                break
+            cursor = (rows[-1]["created_at"], rows[-1]["id"])
+        return times
+
+    def tags(clear: bool) -> list:
+        if clear:
+            return timed_calls([lambda: (store.fetch_all_tags.clear(), store.fetch_all_tags())] * args.repeat)
+        return timed_calls([store.fetch_all_tags] * args.repeat)
+
+    ids = list(fakes["supabase"].rows)
+    sample = random.sample(ids, min(args.repeat, len(ids)))
+
+    result = {"rows": args.rows, "seed_s": seeded}
+    for label, clear in (("cold", True), ("warm", False)):
+        if not clear:
+            # cold 단계는 호출마다 캐시를 비워 마지막 호출 결과만 남아 있음 → 측정할 페이지/행을 먼저 채워 둠
+            for tag in ("", top_tag, rare_tag):
+                walk(tag, args.pages, clear=False)
+            for i in sample:
+                store.fetch_one(i)
+        result[label] = {
+            "fetch_summaries": percentiles(walk("", args.pages, clear)),
+            "fetch_summaries_top_tag": percentiles(walk(top_tag, args.pages, clear)),
+            "fetch_summaries_rare_tag": percentiles(walk(rare_tag, args.pages, clear)),
+            "fetch_all_tags": percentiles(tags(clear)),
+            "count_summaries": percentiles(timed_calls(
+                [lambda: (clear and store.count_summaries.clear(), store.count_summaries(top_tag))] * args.repeat)),
+            "fetch_one": percentiles(timed_calls(
+                [(lambda i=i: (clear and store.fetch_one.clear(), store.fetch_one(i))) for i in sample])),
+        }
+
+    # 여러 세션이 동시에 목록을 넘길 때 (캐시 없이) 처리량
+    store.fetch_summaries.clear()
+    tag_list = [t["tag"] for t in fakes["supabase"].tag_counts()]
+    latencies, lock = [], threading.Lock()
+
+    def session(n: int):
+        times = []
+        for tag in random.Random(n).sample(tag_list, min(3, len(tag_list))):
+            times += walk(tag, args.pages, clear=False)
+        with lock:
+            latencies.extend(times)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+        list(pool.map(session, range(args.sessions)))
+    elapsed = time.perf_counter() - start
+    result["concurrent"] = {
+        "sessions": args.sessions,
+        "calls_per_s": len(latencies) / elapsed if elapsed else 0,
+        "fetch_summaries": percentiles(latencies),
+    }
+    return result
+
+
+# ── 출력 / 비교 ──────────────────────────────────────
+def flatten(d: dict, prefix: str = "") -> dict:
+    out = {}
+    for k, v in d.items():
+        key = f"{prefix}{k}"
+        if isinstance(v, dict):
+            out.update(flatten(v, key + "."))
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            out[key] = v
+    return out
+
+
+def report(result: dict, baseline: dict = None):
+    flat = flatten(result)
+    base = flatten(baseline) if baseline else {}
+    width = max(len(k) for k in flat)
+    for key, value in flat.items():
+        line = f"{key:<{width}}  {value:>12.4f}" if isinstance(value, float) else f"{key:<{width}}  {value:>12}"
+        if key in base and base[key]:
+            line += f"  ({(value - base[key]) / base[key] * 100:+.1f}%)"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="가짜 외부 서비스로 봇/대시보드 오프라인 벤치마크")
+    parser.add_argument("target", choices=["bot", "dashboard"])
+    parser.add_argument("--latency", nargs="*", metavar="SERVICE=SEC", help="서비스별 응답 지연 (초)")
+    parser.add_argument("--error-rate", nargs="*", metavar="SERVICE=P", help="서비스별 5xx 확률 (0~1)")
+    parser.add_argument("--payload", nargs="*", metavar="SERVICE=N",
+                        help="apify: 트랜스크립트 글자 수, openai: 요약 글자 수, cdn: 이미지 가로 픽셀")
+    parser.add_argument("--openai-throughput", type=float, default=400, help="요약 출력 속도 (글자/초, 0=즉시)")
+    parser.add_argument("--json", help="결과를 JSON으로 저장")
+    parser.add_argument("--baseline", help="이전 --json 결과와 비교해 변화율 표시")
+    parser.add_argument("--verbose", action="store_true", help="봇 로그 출력")
+    bot_opts = parser.add_argument_group("bot")
+    bot_opts.add_argument("--links", type=int, default=100)
+    bot_opts.add_argument("--links-per-message", type=int, default=1)
+    bot_opts.add_argument("--chats", type=int, default=10)
+    bot_opts.add_argument("--burst", type=int, default=50, help="동시에 보내는 메시지 수")
+    bot_opts.add_argument("--interval", type=float, default=0.0, help="burst 사이 간격 (초)")
+    bot_opts.add_argument("--instagram-ratio", type=float, default=0.3)
+    bot_opts.add_argument("--dup-ratio", type=float, default=0.05)
+    bot_opts.add_argument("--timeout", type=float, default=600)
+    dash_opts = parser.add_argument_group("dashboard")
+    dash_opts.add_argument("--rows", type=int, default=10000)
+    dash_opts.add_argument("--transcript-chars", type=int, default=20000)
+    dash_opts.add_argument("--pages", type=int, default=10)
+    dash_opts.add_argument("--repeat", type=int, default=20)
+    dash_opts.add_argument("--sessions", type=int, default=8)
+    args = parser.parse_args()
+
+    random.seed(0)
+    fakes = start_all(behaviors(args))
+    rss_before = peak_rss_mb()
+    tmpdir = tempfile.mkdtemp(prefix="bench-")
+    set_env(fakes, os.path.join(tmpdir, "jobs.db"))
+
+    # 봇의 print 로그는 기본적으로 버림 (메모리에 쌓으면 측정값이 흐려짐)
+    log = sys.stdout if args.verbose else open(os.devnull, "w")
+    with contextlib.redirect_stdout(log):
+        if args.target == "bot":
+            result = asyncio.run(bench_bot(args, fakes))
+        else:
+            result = bench_dashboard(args, fakes)
+
+    result["peak_rss_mb"] = peak_rss_mb()
+    result["rss_before_mb"] = rss_before  # 가짜 서버도 같은 프로세스 → 증가분을 볼 것
+    result["services"] = {name: fake.stats() for name, fake in fakes.items()}
+    for fake in fakes.values():
+        fake.stop()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print(f"== {args.target} ==")
+    report(result, baseline)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,105 +1,89 @@
-import os, re, asyncio, requests, threading, tempfile
+import os, io, re, time, signal, asyncio, hashlib, requests, tempfile, functools, subprocess
+from concurrent.futures import ThreadPoolExecutor
 import yt_dlp
-from openai import AsyncOpenAI
+from PIL import Image, ImageOps
 from telegram import Update
 from telegram.ext import ApplicationBuilder, MessageHandler, ContextTypes, filters
 from supabase import create_client
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from aiohttp import web
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+from jobqueue import JobQueue, STAGES, FAILED, next_stage
+from transcripts import HedgedFetcher, NO_CAPTIONS, clean_transcript, save_transcript
+from ratelimit import ChatLimiter
+from metrics import (
+    timed, record_transcript_source, record_transcript_clean, update_queue_depth, JOB_STAGE_SECONDS, APIFY_RUNS,
+)
+from summarizer import ai, summarize, parse_tags, parse_title, parse_one_line
 
 # ── 설정 ────────────────────────────────────────────
 TELEGRAM_TOKEN  = os.environ["TELEGRAM_TOKEN"]
-OPENAI_API_KEY  = os.environ["OPENAI_API_KEY"]
 SUPABASE_URL    = os.environ["SUPABASE_URL"]
 SUPABASE_KEY    = os.environ["SUPABASE_KEY"]
 APIFY_TOKEN     = os.environ.get("APIFY_TOKEN", "")
 DASHBOARD_URL   = os.environ.get("DASHBOARD_URL", "")
+# 외부 API 주소 (벤치마크에서는 bench/fakes.py의 로컬 가짜 서버로 바꿔 끼움)
+APIFY_API_URL   = os.environ.get("APIFY_API_URL", "https://api.apify.com")
+YOUTUBE_THUMB_URL = os.environ.get("YOUTUBE_THUMB_URL", "https://i.ytimg.com")
+BLOCKING_WORKERS = int(os.environ.get("BLOCKING_WORKERS", "8"))
+PORT            = int(os.environ.get("PORT", 8080))
+# WEBHOOK_URL(공개 주소, 예: https://xxx.up.railway.app)이 있으면 웹훅 모드, 없으면 롱 폴링
+# 웹훅 모드는 레플리카 여러 개를 같은 주소 뒤에 둘 수 있음
+WEBHOOK_URL     = os.environ.get("WEBHOOK_URL", "")
+WEBHOOK_PATH    = "/telegram"
+# 텔레그램이 보내는 X-Telegram-Bot-Api-Secret-Token 확인용. 기본값은 토큰에서 파생 (레플리카끼리 같음)
+WEBHOOK_SECRET  = os.environ.get("WEBHOOK_SECRET") or hashlib.sha256(TELEGRAM_TOKEN.encode()).hexdigest()[:32]
+WEBHOOK_MAX_CONNECTIONS = int(os.environ.get("WEBHOOK_MAX_CONNECTIONS", "40"))
+QUEUE_PATH      = os.environ.get("QUEUE_PATH", "jobs.db")  # Railway volume 경로로 두면 재배포에도 유지
+
+# 단계별 동시 처리 수 (Apify / OpenAI 한도에 맞춰 조정)
+STAGE_CONCURRENCY = {
+    "transcript": int(os.environ.get("TRANSCRIPT_WORKERS", "4")),
+    "summarize":  int(os.environ.get("SUMMARIZE_WORKERS", "4")),
+    "persist":    int(os.environ.get("PERSIST_WORKERS", "2")),
+    "thumbnail":  int(os.environ.get("THUMBNAIL_WORKERS", "2")),
+}
+APIFY_BATCH_SIZE      = int(os.environ.get("APIFY_BATCH_SIZE", "10"))   # Apify 실행 1회에 묶을 링크 수
+PLAYLIST_LIMIT        = int(os.environ.get("PLAYLIST_LIMIT", "50"))     # 재생목록/채널에서 가져올 최대 영상 수
+MAX_LINKS_PER_MESSAGE = 100
+TRANSCRIPT_HEDGE_DELAY = float(os.environ.get("TRANSCRIPT_HEDGE_DELAY", "45"))  # 초, 이 시간 안에 안 끝나면 다음 소스 동시 시작
+TRANSCRIPT_DEADLINE    = float(os.environ.get("TRANSCRIPT_DEADLINE", "180"))    # 초, 자막 조회 전체 상한 (넘으면 음성 인식으로)
+APIFY_TIMEOUT          = int(os.environ.get("APIFY_TIMEOUT", "150"))            # 초, Apify 실행 1회 HTTP 대기 상한
+SUBTITLE_LANGS         = ["ko", "en"]  # yt-dlp 자막 선호 언어
+# 썸네일 변형: 그리드 카드(16:9 crop) / 상세 보기. 인스타그램 상세는 원본 비율 유지
+THUMB_VARIANTS      = {"grid": (480, 270), "detail": (1280, 720)}
+YOUTUBE_THUMB_CHAIN = ["maxresdefault", "sddefault", "hqdefault"]
+BATCH_EDIT_INTERVAL   = 3  # 초, 배치 진행 메시지 수정 간격 (텔레그램 수정 한도)
+MAX_ATTEMPTS        = 3
+RETRY_DELAY         = 5    # 초, 시도마다 2배
+QUEUE_POLL_INTERVAL = 5
+WHISPER_SEGMENT_SECONDS = int(os.environ.get("WHISPER_SEGMENT_SECONDS", "300"))  # 음성 인식 세그먼트 길이
+WHISPER_CONCURRENCY     = int(os.environ.get("WHISPER_CONCURRENCY", "4"))
+WHISPER_BITRATE         = os.environ.get("WHISPER_BITRATE", "32")        # kbps, 음성 인식에는 충분
+WHISPER_LANGUAGE        = os.environ.get("WHISPER_LANGUAGE", "ko")       # 비우면 자동 감지
+STREAM_SUMMARY       = os.environ.get("STREAM_SUMMARY", "1") == "1"  # 요약을 생성되는 대로 메시지에 표시
+STREAM_EDIT_INTERVAL = float(os.environ.get("STREAM_EDIT_INTERVAL", "1.5"))  # 초, 같은 메시지 수정 간격
+# 채팅별 속도 제한: CHAT_BURST개까지는 바로, 그 뒤로는 분당 CHAT_LINKS_PER_MINUTE개씩 시작
+CHAT_LINKS_PER_MINUTE = float(os.environ.get("CHAT_LINKS_PER_MINUTE", "10"))
+CHAT_BURST            = int(os.environ.get("CHAT_BURST", "20"))
+# Apify 전체 동시 실행 상한 (모든 채팅·단계 공유, OpenAI 상한은 summarizer.OPENAI_CONCURRENCY)
+APIFY_CONCURRENCY  = int(os.environ.get("APIFY_CONCURRENCY", "3"))  # Apify 플랜 메모리 한도 / 실행당 1024MB
 
 supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-ai       = AsyncOpenAI(api_key=OPENAI_API_KEY)
 
-YOUTUBE_PROMPT = """당신은 유튜브 영상을 요약하는 전문가입니다.
-youtube transcript가 인입됩니다. 약간의 노이즈가 있기 때문에 그것을 감안하여 아래 요약 템플릿 형태로 요약을 수행해주세요.
-또한 keyword tag도 5개 정도 정의해서 출력
-tag안에 들어가는 키워드는 명사
+# requests / supabase(sync) / yt-dlp 같은 블로킹 호출은 전용 스레드풀에서 실행
+# → 이벤트 루프가 멈추지 않아 다른 채팅 메시지도 동시에 처리됨
+executor = ThreadPoolExecutor(max_workers=BLOCKING_WORKERS, thread_name_prefix="blocking")
 
----
-## 🚀 [제목] (Title)
+async def run_blocking(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(fn, *args, **kwargs))
 
-### 💡 핵심 비유 (Analogy)
-- 내용을 한눈에 파악할 수 있는 강력하고 기억하기 쉬운 비유 또는 캐치프레이즈
-
-### ✨ 핵심 요약 (Key Points)
-- 가장 중요한 내용 3가지 요약
-    - Point 1
-    - Point 2
-    - Point 3
-
-### 📚 상세 내용 (Details)
-- 핵심 요약에서 제시된 내용에 대한 구체적인 설명, 배경 또는 주요 특징 기술
-
-### 🤔 비판적 관점 (Critical Points)
-- 해당 내용에 대해 주의 깊게 생각하거나 경계해야 할 지점
-    - Point 1
-    - Point 2
-
-### 📊 숫자 (Numbers)
-*(선택 사항: 관련 데이터가 중요할 경우)*
-- 핵심 통계 1:
-- 핵심 통계 2:
-
-### 👟 쉬운 첫걸음 (Easy Next Step)
-- 핵심 교훈을 바탕으로, 가장 마찰이 적고 즉시 실행 가능한 구체적인 행동 1가지 제안
-
----
-### 🧩 핵심 개념 & 용어
-- 기술적으로 중요하거나 어려운 핵심 용어 3개를 비유를 통해 한 줄로 설명
-    - **용어 1**:
-    - **용어 2**:
-    - **용어 3**:
-
-### 📖 참고: 선행 지식 (Prerequisites)
-- 이 정보를 완전히 이해하기 위해 필요한 사전 지식이나 조건
-
----
-[TAGS] 태그1, 태그2, 태그3, 태그4, 태그5
-
----
-transcript:
-{content}
-"""
-
-INSTAGRAM_PROMPT = """당신은 인스타그램 게시물을 요약하는 전문가입니다.
-아래 인스타그램 캐션(caption) 텍스트를 분석하고 요약해주세요.
-keyword tag도 5개 정도 정의해서 출력 (tag는 명사)
-
----
-## 📸 [제목] (Title)
-
-### 💡 핵심 메시지 (Key Message)
-- 게시물의 핵심 메시지를 한 줄로 요약
-
-### ✨ 주요 내용 (Key Points)
-- 중요한 내용 3가지
-    - Point 1
-    - Point 2
-    - Point 3
-
-### 📚 상세 내용 (Details)
-- 게시물의 구체적인 내용, 맥락 설명
-
-### 🤔 인사이트 (Insights)
-- 이 게시물에서 얻을 수 있는 인사이트나 시사점
-
-### 👟 액션 아이템 (Action Item)
-- 이 게시물을 보고 바로 실행할 수 있는 행동 1가지
-
----
-[TAGS] 태그1, 태그2, 태그3, 태그4, 태그5
-
----
-caption:
-{content}
-"""
+queue = JobQueue(QUEUE_PATH)
+stage_events: dict = {}  # 단계 → asyncio.Event (새 작업 도착 알림)
+idle_transcript_workers: dict = {}  # 소스 → 작업을 기다리는 transcript 작업자 수
+whisper_semaphore = asyncio.Semaphore(WHISPER_CONCURRENCY)  # Whisper 세그먼트 동시 호출 수
+apify_semaphore  = asyncio.Semaphore(APIFY_CONCURRENCY)
+chat_limiter = ChatLimiter(CHAT_LINKS_PER_MINUTE / 60, CHAT_BURST)
 
 # ── 유틸 함수 ────────────────────────────────────────
 def is_youtube(url: str) -> bool:
@@ -119,255 +103,916 @@ def extract_video_id(url: str):
             return m.group(1)
     return None
 
+LINK_RE = re.compile(r"(?:https?://)?(?:www\.|m\.)?(?:youtube\.com|youtu\.be|instagram\.com)/[^\s<>\"']+")
+
+def extract_links(text: str) -> list:
+    return LINK_RE.findall(text)
+
+def is_youtube_collection(url: str) -> bool:
+    # watch?v=...&list=... 은 단일 영상으로 취급
+    if not is_youtube(url) or extract_video_id(url):
+        return False
+    return "list=" in url or bool(re.search(r"youtube\.com/(?:playlist|@[^/?]+|channel/|c/|user/)", url))
+
+def extract_instagram_shortcode(url: str):
+    m = re.search(r"instagram\.com/(?:[A-Za-z0-9_.]+/)?(?:p|reels?|tv)/([A-Za-z0-9_-]+)", url)
+    return m.group(1) if m else None
+
+def content_key(url: str) -> str:
+    # youtu.be / shorts / watch?v= 등 표기가 달라도 같은 영상이면 같은 키
+    if is_youtube(url):
+        video_id = extract_video_id(url)
+        if video_id:
+            return f"yt:{video_id}"
+    elif is_instagram(url):
+        shortcode = extract_instagram_shortcode(url)
+        if shortcode:
+            return f"ig:{shortcode}"
+    return f"url:{url.split('?')[0].rstrip('/')}"
+
 def get_thumbnail(video_id: str) -> str:
-    return f"https://img.youtube.com/vi/{video_id}/maxresdefault.jpg"
-
-def parse_tags(summary: str) -> list:
-    m = re.search(r"\[TAGS\]\s*(.+)", summary)
-    if m:
-        return [t.strip() for t in m.group(1).split(",") if t.strip()][:5]
-    return []
-
-def parse_title(summary: str) -> str:
-    m = re.search(r"##\s*[🚀📸]\s*(.+?)(?:\s*\(Title\))?$", summary, re.MULTILINE)
-    if m:
-        return m.group(1).strip().strip("[]")
-    return "제목 없음"
-
-def parse_one_line(summary: str) -> str:
-    m = re.search(r"(?:핵심 비유|핵심 메시지).*?\n-\s*(.+)", summary)
-    if m:
-        return m.group(1).strip()
-    return ""
-
-def upload_thumbnail(image_url: str, item_id: str) -> str:
+    # 썸네일 단계가 WebP로 바꾸기 전까지 쓰는 임시 URL (hqdefault는 모든 영상에 존재)
+    return f"{YOUTUBE_THUMB_URL}/vi/{video_id}/hqdefault.jpg"
+
+def fetch_image(url: str):
     try:
-        res = requests.get(image_url, timeout=30)
-        if res.status_code != 200:
-            return image_url
-        content_type = res.headers.get("Content-Type", "image/jpeg")
-        ext = "png" if "png" in content_type else "webp" if "webp" in content_type else "jpg"
-        file_path = f"{item_id}.{ext}"
+        res = requests.get(url, timeout=30)
+        if res.status_code == 200 and len(res.content) > 1000:
+            return res.content, res.headers.get("Content-Type", "image/jpeg")
+    except Exception as e:
+        print(f"이미지 다운로드 오류 ({url}): {e}")
+    return None, None
+
+def fetch_youtube_thumbnail(video_id: str):
+    # maxresdefault는 없는 영상이 많음 → 있는 것 중 가장 큰 것
+    for name in YOUTUBE_THUMB_CHAIN:
+        data, content_type = fetch_image(f"{YOUTUBE_THUMB_URL}/vi/{video_id}/{name}.jpg")
+        if data:
+            return data, content_type
+    return None, None
+
+def make_variant(data: bytes, size: tuple, crop: bool) -> bytes:
+    """crop=True면 size 비율로 가운데를 잘라냄 (4:3 레터박스 제거), 아니면 비율 유지 축소"""
+    with Image.open(io.BytesIO(data)) as im:
+        im = im.convert("RGB")
+        if crop:
+            im = ImageOps.fit(im, size, Image.LANCZOS)
+        else:
+            im.thumbnail(size, Image.LANCZOS)
+        out = io.BytesIO()
+        im.save(out, "WEBP", quality=80, method=4)
+        return out.getvalue()
+
+def upload_image(file_path: str, data: bytes, content_type: str) -> str:
+    with timed("thumbnail_upload"):
         supabase.storage.from_("thumbnails").upload(
-            file_path, res.content,
+            file_path, data,
             {"content-type": content_type, "upsert": "true"}
         )
-        public_url = f"{SUPABASE_URL}/storage/v1/object/public/thumbnails/{file_path}"
-        print(f"썸네일 업로드 완료: {public_url}")
-        return public_url
-    except Exception as e:
-        print(f"썸네일 업로드 오류: {e}")
-        return image_url
+    return f"{SUPABASE_URL}/storage/v1/object/public/thumbnails/{file_path}"
 
 def save_to_db(data: dict) -> str:
-    res = supabase.table("youtube_summaries").insert(data).execute()
+    with timed("db_insert"):
+        res = supabase.table("youtube_summaries").insert(data).execute()
     return res.data[0]["id"] if res.data else ""
 
-async def summarize(content: str, prompt_template: str) -> str:
-    res = await ai.chat.completions.create(
-        model="gpt-4o",
-        max_tokens=4096,
-        messages=[{"role": "user", "content": prompt_template.format(content=content[:12000])}]
+def find_by_content_keys(keys: list) -> dict:
+    res = (
+        supabase.table("youtube_summaries")
+        .select("id, title, summary_text, tags, source_type, content_key")
+        .in_("content_key", keys)
+        .order("created_at", desc=True)
+        .execute()
     )
-    return res.choices[0].message.content
+    rows = {}
+    for row in res.data or []:
+        rows.setdefault(row["content_key"], row)
+    return rows
+
+def find_by_content_key(key: str):
+    return find_by_content_keys([key]).get(key)
+
+def update_thumbnail_urls(item_id: str, urls: dict):
+    supabase.table("youtube_summaries").update(urls).eq("id", item_id).execute()
+
+class StreamEditor:
+    """스트리밍 중인 요약을 텔레그램 메시지에 반영.
+    수정 한도를 넘지 않도록 STREAM_EDIT_INTERVAL마다 최신 텍스트로 한 번만 수정"""
+
+    def __init__(self, bot, targets: list):
+        self.bot = bot
+        self.targets = targets  # [(chat_id, message_id)]
+        self.latest = ""
+        self.sent = ""
+        self.last_edit = 0.0
+        self.task = None
+
+    def update(self, text: str):
+        self.latest = text
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._flush())
+
+    def stream(self, partial: str):
+        # 메시지 길이 제한(4096자) 안에서 최근 부분만 보여줌
+        tail = partial if len(partial) <= 3500 else "…" + partial[-3500:]
+        self.update(f"🤖 AI 요약 중...\n\n{tail} ▌")
+
+    async def _flush(self):
+        wait = self.last_edit + STREAM_EDIT_INTERVAL - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        text = self.latest
+        if text == self.sent:
+            return
+        self.sent, self.last_edit = text, time.monotonic()
+        for chat_id, message_id in self.targets:
+            try:
+                await self.bot.edit_message_text(text, chat_id=chat_id, message_id=message_id)
+            except Exception as e:
+                print(f"스트리밍 메시지 수정 오류 ({chat_id}/{message_id}): {e}")
+
+    async def close(self):
+        # 마지막 중간 수정이 최종 답장을 덮어쓰지 않도록 정리
+        if self.task and not self.task.done():
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
 
 # ── YouTube 트랜스크립트 ─────────────────────────────
-def get_youtube_transcript(video_id: str) -> str:
-    for attempt in range(3):
-        try:
-            run_url = f"https://api.apify.com/v2/acts/karamelo~youtube-transcripts/run-sync-get-dataset-items?token={APIFY_TOKEN}&memory=1024&timeout=120"
-            payload = {"urls": [f"https://www.youtube.com/watch?v={video_id}"]}
-            res = requests.post(run_url, json=payload, timeout=180)
-            data = res.json()
-            print(f"Apify YouTube 응답 (시도 {attempt+1}): {str(data)[:200]}")
-            if data and len(data) > 0:
-                item = data[0]
-                captions = item.get("captions") or []
-                texts = []
-                for c in captions:
-                    if c is None:
-                        continue
-                    if isinstance(c, str):
-                        texts.append(c)
-                    elif isinstance(c, dict):
-                        texts.append(c.get("text", ""))
-                if texts:
-                    return " ".join(texts)
-                print(f"captions 비어있음, 재시도 중... ({attempt+1}/3)")
-        except Exception as e:
-            print(f"YouTube 트랜스크립트 오류 (시도 {attempt+1}): {e}")
-    return ""
+def apify_run_url(actor: str, batch_size: int) -> str:
+    # 배치 크기에 맞춰 actor timeout 조정하되 HTTP 대기(APIFY_TIMEOUT)보다 먼저 끝나도록
+    timeout = min(APIFY_TIMEOUT - 10, 90 + 20 * batch_size)
+    return f"{APIFY_API_URL}/v2/acts/{actor}/run-sync-get-dataset-items?token={APIFY_TOKEN}&memory=1024&timeout={timeout}"
+
+def caption_segments(item: dict) -> list:
+    """Apify 자막 조각 → [(시작 초 또는 None, 텍스트)] (액터 버전에 따라 문자열 또는 dict)"""
+    segments = []
+    for c in item.get("captions") or []:
+        if isinstance(c, str):
+            segments.append((None, c))
+        elif isinstance(c, dict):
+            start = c.get("start", c.get("offset"))
+            try:
+                start = float(start) if start is not None else None
+            except (TypeError, ValueError):
+                start = None
+            segments.append((start, c.get("text") or ""))
+    return segments
+
+def match_items(items: list, keys: list, key_of) -> dict:
+    """Apify 결과를 요청 키에 매칭. 키를 못 찾으면 요청 순서로 대응"""
+    matched = {}
+    for item in items:
+        key = key_of(item)
+        if key in keys and key not in matched:
+            matched[key] = item
+    if not matched and len(items) == len(keys):
+        matched = dict(zip(keys, items))
+    return matched
+
+def apify_youtube_transcripts(video_ids: list) -> dict:
+    """video_id 여러 개를 Apify 한 번의 실행으로 처리 → {video_id: 정리된 transcript 또는 NO_CAPTIONS}
+    응답에 없는 video_id만 빠짐 (재시도는 HedgedFetcher가). 빈 자막은 확정이 아니라 다른 소스에도 물어봄"""
+    payload = {"urls": [f"https://www.youtube.com/watch?v={v}" for v in video_ids]}
+    try:
+        res = requests.post(apify_run_url("karamelo~youtube-transcripts", len(video_ids)), json=payload, timeout=APIFY_TIMEOUT)
+        res.raise_for_status()
+    except Exception:
+        APIFY_RUNS.labels("youtube-transcripts", "error").inc()
+        raise
+    APIFY_RUNS.labels("youtube-transcripts", "ok").inc()
+    data = res.json()
+    print(f"Apify YouTube 응답 ({len(video_ids)}개): {str(data)[:200]}")
+    results = {}
+    if isinstance(data, list):
+        key_of = lambda item: extract_video_id(str(item.get("url") or item.get("inputUrl") or item.get("videoUrl") or "")) or item.get("videoId")
+        for video_id, item in match_items(data, video_ids, key_of).items():
+            transcript = clean_transcript(caption_segments(item))
+            results[video_id] = transcript if transcript["text"] else NO_CAPTIONS
+    return results
+
+def pick_subtitle(info: dict):
+    """수동 자막(선호 언어 → 아무 언어) → 자동 자막(원어 → 선호 언어) 순으로 json3 트랙 URL"""
+    manual = info.get("subtitles") or {}
+    auto = info.get("automatic_captions") or {}
+    candidates = (
+        [manual[l] for l in SUBTITLE_LANGS if l in manual]
+        + list(manual.values())
+        + [tracks for l, tracks in auto.items() if l.endswith("-orig")]
+        + [auto[l] for l in SUBTITLE_LANGS if l in auto]
+    )
+    for tracks in candidates:
+        for t in tracks:
+            if t.get("ext") == "json3" and t.get("url"):
+                return t["url"]
+    return None
 
-# ── Instagram 릴스 Whisper STT ───────────────────────
-def get_reels_stt(video_url: str) -> str:
+def ytdlp_transcript(video_id: str):
+    """yt-dlp로 자막 트랙을 찾아 정리된 transcript로 (영상은 받지 않음). 자막이 없으면 None"""
+    ydl_opts = {"skip_download": True, "quiet": True, "writesubtitles": True, "writeautomaticsub": True}
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(f"https://www.youtube.com/watch?v={video_id}", download=False)
+    url = pick_subtitle(info or {})
+    if not url:
+        return None
+    res = requests.get(url, timeout=30)
+    res.raise_for_status()
+    segments = []
+    for event in res.json().get("events") or []:
+        line = "".join(seg.get("utf8", "") for seg in event.get("segs") or []).strip()
+        if line:
+            segments.append((event.get("tStartMs", 0) / 1000, line))
+    transcript = clean_transcript(segments)
+    return transcript if transcript["text"] else None
+
+async def run_apify(fn, *args):
+    # 동시 실행 수가 플랜 한도를 넘으면 Apify가 실행을 거절 → 여기서 먼저 대기
+    # 헤지에서 져서 취소돼도 스레드의 HTTP 요청과 Apify 실행은 계속됨 → 슬롯은 스레드가 끝날 때 반환
+    await apify_semaphore.acquire()
+    future = asyncio.get_running_loop().run_in_executor(executor, functools.partial(fn, *args))
+
+    def release(f):
+        apify_semaphore.release()
+        if not f.cancelled():
+            f.exception()  # 버려진 호출의 오류는 여기서 소비 (경고 로그 방지)
+
+    future.add_done_callback(release)
+    return await asyncio.shield(future)
+
+async def apify_source(video_ids: list) -> dict:
+    return await run_apify(apify_youtube_transcripts, video_ids)
+
+async def ytdlp_source(video_ids: list) -> dict:
+    # 오류가 난 영상만 빠짐 (재시도), 자막 트랙이 없는 영상은 NO_CAPTIONS
+    texts = await asyncio.gather(*(run_blocking(ytdlp_transcript, v) for v in video_ids), return_exceptions=True)
+    return {v: t or NO_CAPTIONS for v, t in zip(video_ids, texts) if not isinstance(t, BaseException)}
+
+TRANSCRIPT_SOURCES = {"apify": apify_source} if APIFY_TOKEN else {}
+TRANSCRIPT_SOURCES["yt-dlp"] = ytdlp_source
+transcript_fetcher = HedgedFetcher(
+    TRANSCRIPT_SOURCES, hedge_delay=TRANSCRIPT_HEDGE_DELAY, deadline=TRANSCRIPT_DEADLINE,
+    authoritative={"yt-dlp"},  # 자막 트랙 목록을 직접 보므로 "자막 없음"을 믿을 수 있음 (Apify 빈 응답은 아님)
+    on_record=record_transcript_source,
+)
+
+def expand_youtube_collection(url: str) -> list:
+    """재생목록/채널 URL → 영상 URL 목록 (최대 PLAYLIST_LIMIT개)"""
+    if not url.startswith("http"):
+        url = "https://" + url
+    # 채널 루트는 탭 목록이 나오므로 동영상 탭으로
+    if re.search(r"youtube\.com/(?:@[^/?]+|channel/[^/?]+|c/[^/?]+|user/[^/?]+)/?(?:\?.*)?$", url):
+        url = url.split("?")[0].rstrip("/") + "/videos"
+    ydl_opts = {"extract_flat": "in_playlist", "playlistend": PLAYLIST_LIMIT, "quiet": True}
     try:
-        with tempfile.TemporaryDirectory() as tmpdir:
-            audio_path = os.path.join(tmpdir, "audio.mp3")
-            ydl_opts = {
-                "format": "bestaudio/best",
-                "outtmpl": os.path.join(tmpdir, "audio.%(ext)s"),
-                "postprocessors": [{
-                    "key": "FFmpegExtractAudio",
-                    "preferredcodec": "mp3",
-                    "preferredquality": "128",
-                }],
-                "quiet": True,
-            }
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([video_url])
-
-            # mp3 파일 찾기
-            for f in os.listdir(tmpdir):
-                if f.endswith(".mp3"):
-                    audio_path = os.path.join(tmpdir, f)
-                    break
-
-            # Whisper STT
-            with open(audio_path, "rb") as audio_file:
-                import asyncio
-                loop = asyncio.new_event_loop()
-                transcript = loop.run_until_complete(
-                    ai.audio.transcriptions.create(
-                        model="whisper-1",
-                        file=audio_file,
-                        language="ko",
-                    )
-                )
-                loop.close()
-            print(f"Whisper STT 완료: {transcript.text[:100]}")
-            return transcript.text
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(url, download=False)
+    except Exception as e:
+        print(f"재생목록/채널 조회 오류: {e}")
+        return []
+    urls = []
+    for entry in (info or {}).get("entries") or []:
+        video_id = (entry or {}).get("id")
+        if video_id and len(video_id) == 11:
+            urls.append(f"https://www.youtube.com/watch?v={video_id}")
+    return urls[:PLAYLIST_LIMIT]
+
+# ── Whisper STT (자막 없는 영상 / 인스타그램 릴스) ────
+def download_audio(video_url: str, tmpdir: str) -> str:
+    """음성 인식용 오디오만 추출: 모노 16kHz 저비트레이트 mp3 (1시간 ≈ 14MB)"""
+    ydl_opts = {
+        "format": "bestaudio/best",
+        "outtmpl": os.path.join(tmpdir, "audio.%(ext)s"),
+        "postprocessors": [{
+            "key": "FFmpegExtractAudio",
+            "preferredcodec": "mp3",
+            "preferredquality": WHISPER_BITRATE,
+        }],
+        "postprocessor_args": {"extractaudio": ["-ac", "1", "-ar", "16000"]},
+        "quiet": True,
+    }
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        ydl.download([video_url])
+    for f in os.listdir(tmpdir):
+        if f.endswith(".mp3"):
+            return os.path.join(tmpdir, f)
+    raise RuntimeError("오디오 추출 실패")
+
+def audio_duration(path: str) -> float:
+    out = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", path],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return float(out.strip() or 0)
+
+def silence_points(path: str) -> list:
+    """무음 구간의 중간 지점(초) 목록"""
+    err = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-i", path, "-af", "silencedetect=noise=-35dB:d=0.4", "-f", "null", "-"],
+        capture_output=True, text=True,
+    ).stderr
+    starts = [float(x) for x in re.findall(r"silence_start: ([\d.]+)", err)]
+    ends = [float(x) for x in re.findall(r"silence_end: ([\d.]+)", err)]
+    return [(s + e) / 2 for s, e in zip(starts, ends)]
+
+def split_audio(path: str, tmpdir: str) -> list:
+    """WHISPER_SEGMENT_SECONDS 근처의 무음 지점에서 잘라 세그먼트 파일 목록 반환"""
+    duration = audio_duration(path)
+    if duration <= WHISPER_SEGMENT_SECONDS * 1.2:
+        return [path]
+    silences = silence_points(path)
+    cuts, pos = [], 0.0
+    while duration - pos > WHISPER_SEGMENT_SECONDS * 1.2:
+        target = pos + WHISPER_SEGMENT_SECONDS
+        # 목표 지점 ±20% 안의 무음 중 가장 가까운 곳, 없으면 그냥 목표 지점
+        window = [t for t in silences if abs(t - target) <= WHISPER_SEGMENT_SECONDS * 0.2]
+        cut = min(window, key=lambda t: abs(t - target)) if window else target
+        cuts.append(cut)
+        pos = cut
+    bounds = [0.0] + cuts + [duration]
+    segments = []
+    for i, (start, end) in enumerate(zip(bounds, bounds[1:])):
+        seg = os.path.join(tmpdir, f"seg_{i:03d}.mp3")
+        subprocess.run(
+            ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y", "-i", path,
+             "-ss", f"{start:.2f}", "-to", f"{end:.2f}", "-c", "copy", seg],
+            check=True,
+        )
+        segments.append(seg)
+    return segments
+
+async def transcribe_segment(path: str) -> str:
+    async with whisper_semaphore:
+        with open(path, "rb") as f:
+            data = f.read()
+        kwargs = {"language": WHISPER_LANGUAGE} if WHISPER_LANGUAGE else {}
+        res = await ai.audio.transcriptions.create(
+            model="whisper-1",
+            file=(os.path.basename(path), data),
+            **kwargs,
+        )
+        return res.text
+
+async def transcribe_audio(video_url: str) -> str:
+    """오디오 추출 → 무음 기준 분할 → 세그먼트 병렬 STT → 순서대로 이어붙임"""
+    try:
+        with timed("whisper"), tempfile.TemporaryDirectory() as tmpdir:
+            audio_path = await run_blocking(download_audio, video_url, tmpdir)
+            segments = await run_blocking(split_audio, audio_path, tmpdir)
+            texts = await asyncio.gather(*(transcribe_segment(seg) for seg in segments))
+        text = " ".join(t.strip() for t in texts if t and t.strip())
+        print(f"Whisper STT 완료 ({len(segments)}개 구간): {text[:100]}")
+        return text
     except Exception as e:
         print(f"Whisper STT 오류: {e}")
         return ""
 
-
-def get_instagram_data(url: str) -> dict:
+def get_instagram_posts(urls: list) -> dict:
+    """인스타그램 게시물 여러 개를 Apify 한 번의 실행으로 처리 → {url: data}"""
+    results = {}
     try:
-        run_url = f"https://api.apify.com/v2/acts/apify~instagram-scraper/run-sync-get-dataset-items?token={APIFY_TOKEN}&memory=1024&timeout=120"
         payload = {
-            "directUrls": [url],
+            "directUrls": urls,
             "resultsType": "posts",
             "resultsLimit": 1,
         }
-        res = requests.post(run_url, json=payload, timeout=180)
+        res = requests.post(apify_run_url("apify~instagram-scraper", len(urls)), json=payload, timeout=APIFY_TIMEOUT)
+        APIFY_RUNS.labels("instagram-scraper", "ok" if res.ok else "error").inc()
         data = res.json()
-        print(f"Apify Instagram 응답: {str(data)[:300]}")
-        if data and len(data) > 0:
-            item = data[0]
-            thumbnail = (
-                item.get("thumbnailUrl") or
-                item.get("coverImageUrl") or
-                item.get("displayUrl") or
-                (item.get("images") or [None])[0] or ""
-            )
-            return {
-                "caption":       item.get("caption") or item.get("text") or "",
-                "thumbnail_url": thumbnail,
-                "owner":         item.get("ownerUsername") or "",
-                "likes":         item.get("likesCount") or 0,
-            }
+        print(f"Apify Instagram 응답 ({len(urls)}개): {str(data)[:300]}")
+        if isinstance(data, list):
+            by_code = {extract_instagram_shortcode(u) or u: u for u in urls}
+            matched = match_items(data, list(by_code), lambda item: item.get("shortCode"))
+            for code, item in matched.items():
+                thumbnail = (
+                    item.get("thumbnailUrl") or
+                    item.get("coverImageUrl") or
+                    item.get("displayUrl") or
+                    (item.get("images") or [None])[0] or ""
+                )
+                results[by_code[code]] = {
+                    "caption":       item.get("caption") or item.get("text") or "",
+                    "thumbnail_url": thumbnail,
+                    "owner":         item.get("ownerUsername") or "",
+                    "likes":         item.get("likesCount") or 0,
+                    "video_url":     item.get("videoUrl") or "",
+                }
     except Exception as e:
         print(f"Instagram 오류: {e}")
-    return {}
-
-# ── 텔레그램 핸들러 ──────────────────────────────────
-async def handle_message(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
-    text = (update.message.text or "").strip()
-    print(f"수신된 메시지: {text}")
-    print(f"is_youtube: {is_youtube(text)}, is_instagram: {is_instagram(text)}")
+    return results
 
-    if is_youtube(text):
-        video_id = extract_video_id(text)
-        if not video_id:
-            await update.message.reply_text("유효한 유튜브 링크를 찾을 수 없어요 😢")
+def get_instagram_data(url: str) -> dict:
+    return get_instagram_posts([url]).get(url, {})
+
+# ── 인제스트 파이프라인 ──────────────────────────────
+class IngestError(Exception):
+    """사용자에게 그대로 보여줄 메시지를 담은 처리 실패 (재시도하지 않음)"""
+
+def result_from_row(row: dict, cached: bool = False) -> dict:
+    summary = row.get("summary_text") or ""
+    return {
+        "id":          row.get("id") or "",
+        "title":       row.get("title") or parse_title(summary),
+        "one_line":    parse_one_line(summary),
+        "tags":        row.get("tags") or [],
+        "source_type": row.get("source_type") or "youtube",
+        "cached":      cached,
+    }
+
+def format_reply(result: dict) -> str:
+    icon = "📸" if result["source_type"] == "instagram" else "🎬"
+    head = "♻️ 이미 요약된 링크예요!" if result["cached"] else "✅ 요약 완료!"
+    reply = f"{head}\n\n{icon} *{result['title']}*\n💡 {result['one_line']}\n🏷️ {' '.join(f'#{t}' for t in result['tags'])}"
+    if DASHBOARD_URL and result["id"]:
+        reply += f"\n\n🔗 [대시보드에서 보기]({DASHBOARD_URL}?card={result['id']})"
+    return reply
+
+def render_batch(items: list) -> str:
+    # 저장까지 끝난 작업은 result가 있음 → 썸네일 단계에서 실패해도 완료로 셈
+    done   = [it for it in items if it["result"]]
+    failed = [it for it in items if not it["result"] and it["stage"] == FAILED]
+    finished = len(done) + len(failed) == len(items)
+    head = f"📦 링크 {len(items)}개 처리 완료!" if finished else f"📦 링크 {len(items)}개 처리 중..."
+    lines = [head, f"✅ {len(done)} · ⏳ {len(items) - len(done) - len(failed)} · ❌ {len(failed)}", ""]
+    for i, it in enumerate(items[:30], 1):
+        result = it["result"]
+        if result:
+            icon = "📸" if result["source_type"] == "instagram" else "🎬"
+            title = result["title"]
+            if DASHBOARD_URL and result["id"]:
+                title = f"[{title}]({DASHBOARD_URL}?card={result['id']})"
+            lines.append(f"{i}. {icon} {title}")
+        elif it["stage"] == FAILED:
+            lines.append(f"{i}. ❌ {it['url']}")
+        else:
+            lines.append(f"{i}. ⏳ {it['url']}")
+    if len(items) > 30:
+        lines.append(f"… 외 {len(items) - 30}개")
+    return "\n".join(lines)
+
+_batch_renders: dict = {}  # batch_id → 예약된 수정 Task
+
+async def edit_batch(bot, batch: dict, delay: float):
+    await asyncio.sleep(delay)
+    _batch_renders.pop(batch["id"], None)
+    text = render_batch(queue.batch_status(batch["id"]))
+    for parse_mode in ("Markdown", None):
+        try:
+            await bot.edit_message_text(
+                text, chat_id=batch["chat_id"], message_id=batch["message_id"],
+                parse_mode=parse_mode, disable_web_page_preview=True,
+            )
             return
-
-        msg = await update.message.reply_text("⏳ 트랜스크립트 가져오는 중...")
-        transcript = get_youtube_transcript(video_id)
+        except Exception as e:
+            # 제목에 마크다운 특수문자가 있으면 파싱 실패 → 일반 텍스트로 재시도
+            print(f"배치 메시지 수정 오류 ({batch['id']}): {e}")
+
+def schedule_batch_render(bot, batch: dict, delay: float = BATCH_EDIT_INTERVAL):
+    # 여러 작업이 연달아 끝나도 배치 메시지는 BATCH_EDIT_INTERVAL마다 한 번만 수정
+    if batch["id"] not in _batch_renders:
+        _batch_renders[batch["id"]] = asyncio.create_task(edit_batch(bot, batch, delay))
+
+async def notify(bot, job_id: int, text: str, final: bool = False, parse_mode: str = None, **kwargs):
+    # 링크 하나짜리 메시지는 단계별 상태를, 여러 개짜리는 집계 메시지를 갱신
+    for batch in queue.batches_for_job(job_id):
+        if batch["total"] > 1:
+            if final:
+                schedule_batch_render(bot, batch)
+            continue
+        for mode in dict.fromkeys((parse_mode, None)):
+            try:
+                await bot.edit_message_text(
+                    text, chat_id=batch["chat_id"], message_id=batch["message_id"], parse_mode=mode, **kwargs,
+                )
+                break
+            except Exception as e:
+                # 제목/태그에 마크다운 특수문자가 있으면 파싱 실패 → 일반 텍스트로 재시도 (edit_batch와 같음)
+                print(f"메시지 수정 오류 ({batch['chat_id']}/{batch['message_id']}): {e}")
+
+async def stage_transcript(bot, job: dict, payload: dict):
+    # transcript_worker가 배치로 미리 가져온 결과(job["fetched"])를 사용
+    fetched = job.get("fetched")
+    if job["source_type"] == "youtube":
+        if fetched is None:
+            with timed("transcript_fetch"):
+                fetched = (await transcript_fetcher.fetch([payload["video_id"]])).get(payload["video_id"], NO_CAPTIONS)
+        transcript = fetched  # 자막 소스가 정리까지 마친 결과
         if not transcript:
-            await msg.edit_text("❌ 자막/트랜스크립트를 가져올 수 없는 영상이에요.")
-            return
+            # 자막이 없는 영상 → 음성 인식
+            await notify(bot, job["id"], "🎙️ 자막이 없어 음성 인식 중...")
+            stt = await transcribe_audio(f"https://www.youtube.com/watch?v={payload['video_id']}")
+            transcript = clean_transcript([(None, stt)])
+        if not transcript["text"]:
+            raise IngestError("❌ 자막/트랜스크립트를 가져올 수 없는 영상이에요.")
+        ratio = record_transcript_clean("youtube", transcript["raw_chars"], len(transcript["text"]))
+        print(f"자막 정리: {transcript['raw_chars']}자 → {len(transcript['text'])}자 ({ratio:.0%})")
+        payload["content"] = transcript["text"]
+        payload["timestamps"] = transcript["timestamps"]
+    else:
+        ig_data = fetched if fetched is not None else await run_apify(get_instagram_data, job["url"])
+        caption = ig_data.get("caption", "")
+        stt = ""
+        if ig_data.get("video_url") or "/reel" in job["url"]:
+            # 릴스는 캡션과 함께 음성 내용도 요약에 포함
+            await notify(bot, job["id"], "🎙️ 릴스 음성 인식 중...")
+            cleaned = clean_transcript([(None, await transcribe_audio(ig_data.get("video_url") or job["url"]))])
+            stt = cleaned["text"]
+            ratio = record_transcript_clean("instagram", cleaned["raw_chars"], len(stt))
+            print(f"릴스 STT 정리: {cleaned['raw_chars']}자 → {len(stt)}자 ({ratio:.0%})")
+        if not caption and not stt:
+            raise IngestError("❌ 캐션을 가져올 수 없는 게시물이에요.")
+        payload["content"] = f"{caption}\n\n[음성 STT]\n{stt}" if stt else caption
+        payload["thumbnail_src"] = ig_data.get("thumbnail_url", "")
+    await notify(bot, job["id"], "🤖 AI 요약 중... (약 30초 소요)")
+
+async def stage_summarize(bot, job: dict, payload: dict):
+    # 링크 하나짜리 메시지에만 요약을 스트리밍 (배치 메시지는 집계만 표시)
+    targets = [(b["chat_id"], b["message_id"]) for b in queue.batches_for_job(job["id"]) if b["total"] == 1]
+    if not (STREAM_SUMMARY and targets):
+        with timed("summarize"):
+            payload["summary"] = await summarize(payload["content"], job["source_type"])
+        return
+    editor = StreamEditor(bot, targets)
+    try:
+        with timed("summarize"):
+            payload["summary"] = await summarize(
+                payload["content"], job["source_type"], on_delta=editor.stream, on_status=editor.update,
+            )
+    finally:
+        await editor.close()
+
+async def stage_persist(bot, job: dict, payload: dict):
+    summary = payload["summary"]
+    row = {
+        "youtube_url":   job["url"],
+        "title":         parse_title(summary),
+        "summary_text":  summary,
+        "tags":          parse_tags(summary),
+        "source_type":   job["source_type"],
+        "content_key":   job["content_key"],
+    }
+    if job["source_type"] == "youtube":
+        row["thumbnail_url"] = get_thumbnail(payload["video_id"])
+    else:
+        row["instagram_url"] = job["url"]
+        row["thumbnail_url"] = payload.get("thumbnail_src", "")
+    # insert 직후 죽었다가 재시작된 경우 중복 저장하지 않도록 먼저 조회
+    existing = await run_blocking(find_by_content_key, job["content_key"])
+    row["id"] = existing["id"] if existing else await run_blocking(save_to_db, row)
+    # 전체 스크립트는 별도 테이블에 압축 저장 (재시도 시에도 덮어쓰기라 안전)
+    with timed("transcript_save"):
+        stored = await run_blocking(save_transcript, supabase, row["id"], payload["content"], payload.get("timestamps"))
+    print(f"스크립트 저장: {stored['raw_bytes']}B → {stored['stored_bytes']}B ({stored['encoding']})")
+    payload["item_id"] = row["id"]
+    payload["result"] = result_from_row(row)
+
+async def stage_thumbnail(bot, job: dict, payload: dict):
+    # 원본 → 그리드/상세용 WebP 변형 생성 → Supabase Storage에 동시 업로드
+    item_id = payload.get("item_id")
+    if not item_id:
+        return
+    youtube = job["source_type"] == "youtube"
+    if youtube:
+        data, content_type = await run_blocking(fetch_youtube_thumbnail, payload["video_id"])
+    elif payload.get("thumbnail_src"):
+        data, content_type = await run_blocking(fetch_image, payload["thumbnail_src"])
+    else:
+        return
+    if not data:
+        return
 
-        await msg.edit_text("🤖 AI 요약 중... (약 30초 소요)")
+    try:
+        variants = {
+            name: await run_blocking(make_variant, data, size, crop=youtube or name == "grid")
+            for name, size in THUMB_VARIANTS.items()
+        }
+    except Exception as e:
+        # 변환 실패 시 원본을 그대로 저장 (인스타그램 CDN URL은 만료되므로)
+        print(f"썸네일 변환 오류: {e}")
+        url = await run_blocking(upload_image, f"{item_id}.{content_type.split('/')[-1]}", data, content_type)
+        await run_blocking(update_thumbnail_urls, item_id, {"thumbnail_url": url})
+        return
+
+    urls = await asyncio.gather(*(
+        run_blocking(upload_image, f"{item_id}/{name}.webp", blob, "image/webp")
+        for name, blob in variants.items()
+    ))
+    urls = dict(zip(variants, urls))
+    print(f"썸네일 업로드 완료: {urls}")
+    await run_blocking(update_thumbnail_urls, item_id, {
+        "thumbnail_url":      urls["detail"],
+        "thumbnail_grid_url": urls["grid"],
+    })
+
+STAGE_HANDLERS = {
+    "transcript": stage_transcript,
+    "summarize":  stage_summarize,
+    "persist":    stage_persist,
+    "thumbnail":  stage_thumbnail,
+}
+
+async def run_job(bot, stage: str, job: dict):
+    payload = job["payload"]
+    start = time.monotonic()
+    try:
         try:
-            summary  = await summarize(transcript, YOUTUBE_PROMPT)
-            title    = parse_title(summary)
-            tags     = parse_tags(summary)
-            one_line = parse_one_line(summary)
-            item_id  = save_to_db({
-                "youtube_url":   text,
-                "title":         title,
-                "thumbnail_url": get_thumbnail(video_id),
-                "summary_text":  summary,
-                "tags":          tags,
-                "video_stt_url": transcript,
-                "source_type":   "youtube",
-            })
-            reply = f"✅ 요약 완료!\n\n🎬 *{title}*\n💡 {one_line}\n🏷️ {' '.join(f'#{t}' for t in tags)}"
-            if DASHBOARD_URL and item_id:
-                reply += f"\n\n🔗 [대시보드에서 보기]({DASHBOARD_URL}?card={item_id})"
-            await msg.edit_text(reply, parse_mode="Markdown")
-        except Exception as e:
-            await msg.edit_text(f"❌ 오류 발생: {e}")
+            await STAGE_HANDLERS[stage](bot, job, payload)
+        finally:
+            elapsed = time.monotonic() - start
+            JOB_STAGE_SECONDS.labels(stage).observe(elapsed)
+            print(f"[trace] job={job['id']} key={job['content_key']} stage={stage} attempt={job['attempts']} {elapsed:.2f}s")
+    except IngestError as e:
+        queue.fail(job["id"], str(e))
+        await notify(bot, job["id"], str(e), final=True)
+        return
+    except Exception as e:
+        print(f"[{stage}] 작업 {job['id']} 오류 (시도 {job['attempts']}/{MAX_ATTEMPTS}): {e}")
+        if job["attempts"] >= MAX_ATTEMPTS:
+            queue.fail(job["id"], str(e))
+            if stage != "thumbnail":
+                await notify(bot, job["id"], f"❌ 오류 발생: {e}", final=True)
+        else:
+            queue.retry(job["id"], RETRY_DELAY * 2 ** (job["attempts"] - 1), str(e))
+            stage_events[stage].set()
+        return
+    queue.advance(job["id"], stage, payload)
+    if stage == "persist":
+        # 답장은 저장 직후 바로 보내고 썸네일은 뒤에서 처리
+        await notify(bot, job["id"], format_reply(payload["result"]), final=True, parse_mode="Markdown")
+    nxt = next_stage(stage)
+    if nxt in stage_events:
+        stage_events[nxt].set()
+
+async def wait_for_work(stage: str):
+    event = stage_events[stage]
+    event.clear()
+    try:
+        # 새 작업 알림을 기다리되, 재시도 대기(not_before) 작업도 주기적으로 확인
+        await asyncio.wait_for(event.wait(), timeout=QUEUE_POLL_INTERVAL)
+    except asyncio.TimeoutError:
+        pass
 
-    elif is_instagram(text):
-        msg = await update.message.reply_text("⏳ 인스타그램 게시물 가져오는 중...")
-        ig_data = get_instagram_data(text)
-        caption = ig_data.get("caption", "")
-        if not caption:
-            await msg.edit_text("❌ 캐션을 가져올 수 없는 게시물이에요.")
-            return
+async def stage_worker(bot, stage: str):
+    while True:
+        job = queue.claim(stage)
+        if job is None:
+            await wait_for_work(stage)
+            continue
+        await run_job(bot, stage, job)
+
+async def transcript_worker(bot, source_type: str):
+    # 같은 소스의 대기 작업을 APIFY_BATCH_SIZE개씩 묶어 Apify 실행 1회로 처리
+    while True:
+        jobs = queue.claim_many("transcript", APIFY_BATCH_SIZE, source_type)
+        if not jobs:
+            await wait_for_work("transcript")
+            continue
+        idle_transcript_workers[source_type] -= 1
+        try:
+            await run_transcript_batch(bot, source_type, jobs)
+        finally:
+            idle_transcript_workers[source_type] += 1
+
+async def run_transcript_batch(bot, source_type: str, jobs: list):
+    if source_type == "youtube":
+        # 자막이 나온 영상부터 바로 다음 처리로 → 느리거나 재시도 중인 영상이 배치 전체를 붙잡지 않음
+        pending = {j["payload"]["video_id"]: j for j in jobs}
+        started = []
+
+        def release(video_id: str, transcript):
+            job = pending.pop(video_id, None)
+            if job:
+                job["fetched"] = transcript
+                started.append(asyncio.create_task(run_job(bot, "transcript", job)))
 
-        await msg.edit_text("🤖 AI 요약 중... (약 30초 소요)")
         try:
-            summary  = await summarize(caption, INSTAGRAM_PROMPT)
-            title    = parse_title(summary)
-            tags     = parse_tags(summary)
-            one_line = parse_one_line(summary)
-            item_id  = save_to_db({
-                "youtube_url":   text,
-                "instagram_url": text,
-                "title":         title,
-                "thumbnail_url": ig_data.get("thumbnail_url", ""),
-                "summary_text":  summary,
-                "tags":          tags,
-                "video_stt_url": caption,
-                "source_type":   "instagram",
-            })
-            # 썸네일 Supabase Storage에 업로드
-            if item_id and ig_data.get("thumbnail_url"):
-                public_url = upload_thumbnail(ig_data["thumbnail_url"], item_id)
-                supabase.table("youtube_summaries").update(
-                    {"thumbnail_url": public_url}
-                ).eq("id", item_id).execute()
-
-            reply = f"✅ 요약 완료!\n\n📸 *{title}*\n💡 {one_line}\n🏷️ {' '.join(f'#{t}' for t in tags)}"
-            if DASHBOARD_URL and item_id:
-                reply += f"\n\n🔗 [대시보드에서 보기]({DASHBOARD_URL}?card={item_id})"
-            await msg.edit_text(reply, parse_mode="Markdown")
+            with timed("transcript_fetch"):
+                await transcript_fetcher.fetch(list(pending), on_result=release)
+            for video_id in list(pending):
+                release(video_id, NO_CAPTIONS)  # 모든 소스 실패 / TRANSCRIPT_DEADLINE 초과 → 음성 인식
         except Exception as e:
-            await msg.edit_text(f"❌ 오류 발생: {e}")
+            print(f"[transcript] 배치 조회 오류: {e}")
+        started += [asyncio.create_task(run_job(bot, "transcript", job)) for job in pending.values()]
+        await asyncio.gather(*started)
+        return
+    try:
+        with timed("transcript_fetch"):
+            fetched = await run_apify(get_instagram_posts, [j["url"] for j in jobs])
+        for job in jobs:
+            job["fetched"] = fetched.get(job["url"], {})
+    except Exception as e:
+        print(f"[transcript] 배치 조회 오류: {e}")
+    await asyncio.gather(*(run_job(bot, "transcript", job) for job in jobs))
+
+async def start_workers(application):
+    queue.purge(older_than=7 * 24 * 3600)
+    print(f"작업 큐 상태: {queue.counts()}")
+    for stage in STAGES:
+        stage_events[stage] = asyncio.Event()
+        stage_events[stage].set()  # 재시작 시 남아 있던 작업부터 처리
+        for _ in range(STAGE_CONCURRENCY[stage]):
+            if stage == "transcript":
+                for source_type in ("youtube", "instagram"):
+                    idle_transcript_workers[source_type] = idle_transcript_workers.get(source_type, 0) + 1
+                    application.create_task(transcript_worker(application.bot, source_type))
+            else:
+                application.create_task(stage_worker(application.bot, stage))
 
-    else:
-        await update.message.reply_text("유튜브 또는 인스타그램 링크를 보내주세요! 🎬📸")
+# ── 텔레그램 핸들러 ──────────────────────────────────
+async def collect_targets(links: list, msg_holder: list, update: Update) -> list:
+    """메시지 속 링크 → (url, source_type, key, payload) 목록. 재생목록/채널은 영상 목록으로 펼침"""
+    urls = []
+    for link in links:
+        if is_youtube_collection(link):
+            if not msg_holder:
+                msg_holder.append(await update.message.reply_text("📋 재생목록/채널 영상 목록 가져오는 중..."))
+            urls += await run_blocking(expand_youtube_collection, link)
+        else:
+            urls.append(link)
+
+    targets, seen = [], set()
+    for url in urls[:MAX_LINKS_PER_MESSAGE]:
+        payload = {}
+        if is_youtube(url):
+            video_id = extract_video_id(url)
+            if not video_id:
+                continue
+            source_type = "youtube"
+            payload["video_id"] = video_id
+        else:
+            source_type = "instagram"
+        key = content_key(url)
+        if key not in seen:
+            seen.add(key)
+            targets.append((url, source_type, key, payload))
+    return targets
 
-# ── 더미 웹서버 (Railway 종료 방지) ─────────────────
-class HealthHandler(BaseHTTPRequestHandler):
-    def do_GET(self):
-        self.send_response(200)
-        self.end_headers()
-        self.wfile.write(b"OK")
-    def log_message(self, *args):
-        pass
+async def handle_message(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
+    text = (update.message.text or "").strip()
+    print(f"수신된 메시지: {text}")
+    links = extract_links(text)
+    print(f"링크 {len(links)}개: {links[:5]}")
 
-def run_web():
-    port = int(os.environ.get("PORT", 8080))
-    HTTPServer(("0.0.0.0", port), HealthHandler).serve_forever()
+    if not links:
+        await update.message.reply_text("유튜브 또는 인스타그램 링크를 보내주세요! 🎬📸")
+        return
+
+    msg_holder = []
+    targets = await collect_targets(links, msg_holder, update)
+    msg = msg_holder[0] if msg_holder else None
+    if not targets:
+        text = "유효한 유튜브 링크를 찾을 수 없어요 😢"
+        await (msg.edit_text(text) if msg else update.message.reply_text(text))
+        return
+
+    # 외부 호출 전에 content_key로 기존 요약부터 조회 (진행 중인 작업은 합류)
+    lookup = [key for _, _, key, _ in targets if queue.active_job(key) is None]
+    cached = await run_blocking(find_by_content_keys, lookup) if lookup else {}
+
+    chat_id = update.effective_chat.id
+    if len(targets) == 1 and targets[0][2] in cached:
+        reply = format_reply(result_from_row(cached[targets[0][2]], cached=True))
+        for parse_mode in ("Markdown", None):
+            try:
+                await (msg.edit_text(reply, parse_mode=parse_mode) if msg else update.message.reply_text(reply, parse_mode=parse_mode))
+                return
+            except Exception as e:
+                # 제목/태그에 마크다운 특수문자가 있으면 파싱 실패 → 일반 텍스트로 재시도
+                print(f"답장 오류: {e}")
+        return
+
+    # 새로 처리할 링크만 채팅별 토큰 버킷에서 차감 → 한도를 넘은 만큼 시작 시각을 뒤로 미룸
+    fresh = [key for _, _, key, _ in targets if key in lookup and key not in cached]
+    now = time.time()
+    start_at = dict(zip(fresh, (now + d for d in chat_limiter.reserve(chat_id, len(fresh)))))
+
+    items, job_ids = [], {}
+    for url, source_type, key, payload in targets:
+        if key in cached:
+            items.append({"url": url, "result": result_from_row(cached[key], cached=True)})
+            continue
+        # 같은 content_key가 진행 중이면 새 파이프라인 대신 그 작업에 합류
+        job_id, _ = queue.enqueue(url, source_type, key, payload, chat_id=chat_id, not_before=start_at.get(key, 0))
+        items.append({"url": url, "job_id": job_id})
+        job_ids.setdefault(source_type, []).append(job_id)
+
+    # 바로 시작하지 못하면 대기 순서를 즉시 알려줌 (타임아웃처럼 보이지 않도록)
+    # 놀고 있는 작업자가 한 번에 가져갈 수 있는 양(작업자 수 × APIFY_BATCH_SIZE)보다 첫 작업 순번이 뒤일 때만
+    deferred = [t - now for t in start_at.values() if t > now + 1]
+    waiting = []
+    for source_type, ids in job_ids.items():
+        positions = queue.positions(ids, source_type)
+        free = idle_transcript_workers.get(source_type, 0) * APIFY_BATCH_SIZE
+        if positions and min(positions.values()) > free:
+            waiting.append(min(positions.values()))
+    wait_note = ""
+    if waiting:
+        wait_note = f"⏳ 요청이 많아 대기 중이에요. {min(waiting)}번째 순서예요."
+    if deferred:
+        wait_note += f"\n🐢 {len(deferred)}개는 속도 제한으로 약 {int(max(deferred))}초 안에 차례로 시작해요."
+    wait_note = wait_note.strip()
+
+    if len(targets) == 1:
+        url, source_type, key, payload = targets[0]
+        if key not in lookup:
+            status = "⏳ 같은 링크를 이미 처리 중이에요. 끝나면 알려드릴게요..."
+        elif wait_note:
+            status = wait_note
+        elif source_type == "youtube":
+            status = "⏳ 트랜스크립트 가져오는 중..."
+        else:
+            status = "⏳ 인스타그램 게시물 가져오는 중..."
+    else:
+        status = f"📦 링크 {len(targets)}개 접수! 처리 중..."
+        if wait_note:
+            status += f"\n{wait_note}"
+    msg = await msg.edit_text(status) if msg else await update.message.reply_text(status)
+
+    batch_id = queue.create_batch(msg.chat_id, msg.message_id, items)
+    stage_events[STAGES[0]].set()
+    if len(items) > 1 and not wait_note:
+        # 대기 안내가 있으면 첫 작업이 끝날 때까지 그대로 보여줌
+        schedule_batch_render(ctx.bot, {"id": batch_id, "chat_id": msg.chat_id, "message_id": msg.message_id}, delay=0)
+
+# ── 웹 서버 (웹훅 / 헬스체크 / 메트릭) ───────────────
+# 봇과 같은 이벤트 루프에서 도는 aiohttp 서버 하나가 모든 HTTP 경로를 처리
+application = None  # main()에서 설정
+
+def bot_alive() -> bool:
+    if not (application and application.running):
+        return False
+    # 폴링 모드면 업데이터 루프까지 살아 있어야 함 (웹훅 모드는 업데이트가 HTTP로 들어옴)
+    return bool(WEBHOOK_URL or (application.updater and application.updater.running))
+
+async def telegram_webhook(request: web.Request) -> web.Response:
+    if request.headers.get("X-Telegram-Bot-Api-Secret-Token") != WEBHOOK_SECRET:
+        return web.Response(status=403)
+    update = Update.de_json(await request.json(), application.bot)
+    # 처리는 Application의 업데이트 큐에서 (concurrent_updates) → 텔레그램에는 바로 200
+    await application.update_queue.put(update)
+    return web.Response(text="OK")
+
+async def metrics_view(request: web.Request) -> web.Response:
+    update_queue_depth(await run_blocking(queue.counts), STAGES)
+    return web.Response(body=generate_latest(), headers={"Content-Type": CONTENT_TYPE_LATEST})
+
+async def healthz_view(request: web.Request) -> web.Response:
+    alive = bot_alive()
+    return web.Response(status=200 if alive else 503, text="OK" if alive else "bot stopped")
+
+async def root_view(request: web.Request) -> web.Response:
+    # Railway 기본 헬스체크 (프로세스 생존 여부만)
+    return web.Response(text="OK")
+
+def build_web_app() -> web.Application:
+    web_app = web.Application()
+    web_app.router.add_post(WEBHOOK_PATH, telegram_webhook)
+    web_app.router.add_get("/metrics", metrics_view)
+    web_app.router.add_get("/healthz", healthz_view)
+    web_app.router.add_get("/", root_view)
+    return web_app
 
 # ── 실행 ─────────────────────────────────────────────
+async def main():
+    global application
+    # concurrent_updates: 링크 하나가 처리되는 동안에도 다른 업데이트를 동시에 처리
+    # updater(None): 웹훅 모드에서는 폴링용 Updater가 필요 없음
+    builder = ApplicationBuilder().token(TELEGRAM_TOKEN).concurrent_updates(True)
+    if WEBHOOK_URL:
+        builder = builder.updater(None)
+    application = builder.build()
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    runner = web.AppRunner(build_web_app(), access_log=None)
+    await runner.setup()
+    async with application:
+        await application.start()
+        await start_workers(application)
+        # 재시작 중 쌓인 업데이트도 버리지 않고 처리 (작업 큐가 중복 링크는 합류시킴)
+        if WEBHOOK_URL:
+            await application.bot.set_webhook(
+                f"{WEBHOOK_URL.rstrip('/')}{WEBHOOK_PATH}",
+                secret_token=WEBHOOK_SECRET,
+                allowed_updates=Update.ALL_TYPES,
+                max_connections=WEBHOOK_MAX_CONNECTIONS,
+            )
+        else:
+            await application.updater.start_polling(allowed_updates=Update.ALL_TYPES)
+        await web.TCPSite(runner, "0.0.0.0", PORT).start()
+        print(f"봇 시작! ({'웹훅' if WEBHOOK_URL else '폴링'} 모드, 포트 {PORT})")
+
+        await stop.wait()
+        print("종료 중...")
+        await runner.cleanup()
+        if application.updater and application.updater.running:
+            await application.updater.stop()
+        await application.stop()
+
 if __name__ == "__main__":
-    threading.Thread(target=run_web, daemon=True).start()
-    app = ApplicationBuilder().token(TELEGRAM_TOKEN).build()
-    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
-    print("봇 시작!")
-    app.run_polling(drop_pending_updates=True)
+    asyncio.run(main())
@@ -0,0 +1,241 @@
+import json, sqlite3, threading, time
+
+# ── 단계 정의 ────────────────────────────────────────
+# 각 작업은 아래 순서대로 진행되며, 단계가 끝날 때마다 stage/payload가 저장됨
+# → 프로세스가 재시작돼도 마지막으로 끝난 단계 다음부터 이어서 처리
+STAGES = ["transcript", "summarize", "persist", "thumbnail"]
+DONE   = "done"
+FAILED = "failed"
+# persist 단계가 끝나면 답장이 나가므로, 같은 링크 요청은 이 단계들에서만 합류
+JOINABLE_STAGES = STAGES[:STAGES.index("persist") + 1]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    content_key TEXT NOT NULL,
+    url         TEXT NOT NULL,
+    source_type TEXT NOT NULL,
+    chat_id     INTEGER NOT NULL DEFAULT 0,  -- 작업을 만든 채팅 (공정 스케줄링 단위)
+    stage       TEXT NOT NULL,
+    payload     TEXT NOT NULL DEFAULT '{}',
+    running     INTEGER NOT NULL DEFAULT 0,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    not_before  REAL NOT NULL DEFAULT 0,
+    error       TEXT,
+    created_at  REAL NOT NULL,
+    updated_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_stage_idx ON jobs (stage, running, not_before, id);
+CREATE INDEX IF NOT EXISTS jobs_key_idx   ON jobs (content_key, stage);
+
+-- 배치 = 텔레그램 메시지 하나(진행 상황 메시지 하나)에 묶인 링크들
+CREATE TABLE IF NOT EXISTS batches (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    chat_id    INTEGER NOT NULL,
+    message_id INTEGER NOT NULL,
+    total      INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+-- job_id가 없으면 이미 요약된 링크 (result에 결과 저장)
+CREATE TABLE IF NOT EXISTS batch_items (
+    batch_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    url      TEXT NOT NULL,
+    job_id   INTEGER,
+    result   TEXT,
+    PRIMARY KEY (batch_id, position)
+);
+CREATE INDEX IF NOT EXISTS batch_items_job_idx ON batch_items (job_id);
+"""
+
+
+# 공정 순서: 채팅별 대기 순번 + 그 채팅이 이 단계에서 이미 처리 중인 작업 수가 작은 것부터
+# → 링크 수십 개를 보낸 채팅이 있어도 다른 채팅의 첫 링크가 먼저 (채팅 간 라운드 로빈)
+FAIR_ORDER = """
+WITH waiting AS (
+    SELECT *, ROW_NUMBER() OVER (PARTITION BY chat_id ORDER BY id) AS rn
+    FROM jobs WHERE stage = ? AND running = 0 AND not_before <= ? {extra}
+),
+busy AS (
+    SELECT chat_id, COUNT(*) AS n FROM jobs WHERE stage = ? AND running = 1 GROUP BY chat_id
+)
+SELECT waiting.*, ROW_NUMBER() OVER (ORDER BY rn + COALESCE(busy.n, 0), waiting.id) AS pos
+FROM waiting LEFT JOIN busy ON busy.chat_id = waiting.chat_id
+"""
+
+
+def next_stage(stage: str) -> str:
+    i = STAGES.index(stage)
+    return STAGES[i + 1] if i + 1 < len(STAGES) else DONE
+
+
+class JobQueue:
+    def __init__(self, path: str):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        # chat_id 컬럼이 없던 이전 버전 DB
+        columns = [r["name"] for r in self.conn.execute("PRAGMA table_info(jobs)")]
+        if "chat_id" not in columns:
+            self.conn.execute("ALTER TABLE jobs ADD COLUMN chat_id INTEGER NOT NULL DEFAULT 0")
+        # 이전 프로세스가 처리하던 중 죽은 작업은 같은 단계부터 다시 시작
+        with self.conn:
+            self.conn.execute("UPDATE jobs SET running = 0 WHERE running = 1")
+
+    def _row(self, row) -> dict:
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        return job
+
+    def active_job(self, content_key: str):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT id FROM jobs WHERE content_key = ? AND stage IN (?, ?, ?) ORDER BY id LIMIT 1",
+                (content_key, *JOINABLE_STAGES),
+            ).fetchone()
+        return row["id"] if row else None
+
+    def enqueue(self, url: str, source_type: str, content_key: str, payload: dict = None,
+                chat_id: int = 0, not_before: float = 0) -> tuple:
+        """(job_id, created) 반환. 같은 content_key가 진행 중이면 그 작업을 재사용
+        not_before: 채팅별 속도 제한으로 미뤄진 시작 시각"""
+        now = time.time()
+        with self.lock, self.conn:
+            row = self.conn.execute(
+                "SELECT id FROM jobs WHERE content_key = ? AND stage IN (?, ?, ?) ORDER BY id LIMIT 1",
+                (content_key, *JOINABLE_STAGES),
+            ).fetchone()
+            if row:
+                return row["id"], False
+            cur = self.conn.execute(
+                "INSERT INTO jobs (content_key, url, source_type, chat_id, stage, payload, not_before, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (content_key, url, source_type, chat_id, STAGES[0], json.dumps(payload or {}), not_before, now, now),
+            )
+            return cur.lastrowid, True
+
+    def create_batch(self, chat_id: int, message_id: int, items: list) -> int:
+        """items: [{"url", "job_id"} 또는 {"url", "result"}] — 메시지 하나에 포함된 링크 순서대로"""
+        with self.lock, self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO batches (chat_id, message_id, total, created_at) VALUES (?, ?, ?, ?)",
+                (chat_id, message_id, len(items), time.time()),
+            )
+            batch_id = cur.lastrowid
+            self.conn.executemany(
+                "INSERT INTO batch_items (batch_id, position, url, job_id, result) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (batch_id, i, it["url"], it.get("job_id"),
+                     json.dumps(it["result"]) if it.get("result") else None)
+                    for i, it in enumerate(items)
+                ],
+            )
+        return batch_id
+
+    def batches_for_job(self, job_id: int) -> list:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT DISTINCT b.* FROM batches b JOIN batch_items i ON i.batch_id = b.id WHERE i.job_id = ?",
+                (job_id,),
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def batch_status(self, batch_id: int) -> list:
+        """배치 안 링크별 상태: result(완료 시), stage, error"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT i.position, i.url, i.result, j.stage, j.payload, j.error "
+                "FROM batch_items i LEFT JOIN jobs j ON j.id = i.job_id "
+                "WHERE i.batch_id = ? ORDER BY i.position",
+                (batch_id,),
+            ).fetchall()
+        items = []
+        for r in rows:
+            payload = json.loads(r["payload"]) if r["payload"] else {}
+            result = json.loads(r["result"]) if r["result"] else payload.get("result")
+            stage = DONE if r["result"] else r["stage"]
+            items.append({"url": r["url"], "stage": stage, "result": result, "error": r["error"]})
+        return items
+
+    def claim(self, stage: str):
+        """해당 단계에서 대기 중인 가장 오래된 작업 하나를 가져와 running 표시"""
+        jobs = self.claim_many(stage, 1)
+        return jobs[0] if jobs else None
+
+    def claim_many(self, stage: str, limit: int, source_type: str = None) -> list:
+        """대기 중인 작업을 공정 순서(FAIR_ORDER)로 최대 limit개까지 한 번에 가져옴 (Apify 배치 실행용)"""
+        now = time.time()
+        extra, args = ("AND source_type = ?", [source_type]) if source_type else ("", [])
+        sql = FAIR_ORDER.format(extra=extra) + " ORDER BY pos LIMIT ?"
+        with self.lock, self.conn:
+            rows = self.conn.execute(sql, (stage, now, *args, stage, limit)).fetchall()
+            self.conn.executemany(
+                "UPDATE jobs SET running = 1, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                [(now, r["id"]) for r in rows],
+            )
+        jobs = [self._row(r) for r in rows]
+        for job in jobs:
+            job.pop("rn", None)
+            job.pop("pos", None)
+            job["running"] = 1
+            job["attempts"] += 1
+        return jobs
+
+    def positions(self, job_ids: list, source_type: str = None) -> dict:
+        """첫 단계 대기열에서 몇 번째로 처리될지 (1부터). 처리 중이거나 아직 시작 시각 전인 작업은 빠짐
+        source_type: 첫 단계 작업자는 소스별로 작업을 가져가므로 같은 소스의 대기열 안에서 순번"""
+        if not job_ids:
+            return {}
+        marks = ",".join("?" * len(job_ids))
+        extra, args = ("AND source_type = ?", [source_type]) if source_type else ("", [])
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT id, pos FROM ({FAIR_ORDER.format(extra=extra)}) WHERE id IN ({marks})",
+                (STAGES[0], time.time(), *args, STAGES[0], *job_ids),
+            ).fetchall()
+        return {r["id"]: r["pos"] for r in rows}
+
+    def advance(self, job_id: int, stage: str, payload: dict):
+        """현재 단계 완료 → payload 저장 후 다음 단계로"""
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET stage = ?, payload = ?, running = 0, attempts = 0, error = NULL, updated_at = ? "
+                "WHERE id = ?",
+                (next_stage(stage), json.dumps(payload), time.time(), job_id),
+            )
+
+    def retry(self, job_id: int, delay: float, error: str):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET running = 0, not_before = ?, error = ?, updated_at = ? WHERE id = ?",
+                (time.time() + delay, error, time.time(), job_id),
+            )
+
+    def fail(self, job_id: int, error: str):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET stage = ?, running = 0, error = ?, updated_at = ? WHERE id = ?",
+                (FAILED, error, time.time(), job_id),
+            )
+
+    def counts(self) -> dict:
+        with self.lock:
+            rows = self.conn.execute("SELECT stage, COUNT(*) AS n FROM jobs GROUP BY stage").fetchall()
+        return {r["stage"]: r["n"] for r in rows}
+
+    def purge(self, older_than: float):
+        """끝난 작업 정리 (older_than초 이전에 done/failed 된 것)"""
+        cutoff = time.time() - older_than
+        with self.lock, self.conn:
+            self.conn.execute(
+                "DELETE FROM batch_items WHERE batch_id IN (SELECT id FROM batches WHERE created_at < ?)",
+                (cutoff,),
+            )
+            self.conn.execute("DELETE FROM batches WHERE created_at < ?", (cutoff,))
+            self.conn.execute(
+                "DELETE FROM jobs WHERE stage IN (?, ?) AND updated_at < ?",
+                (DONE, FAILED, cutoff),
+            )
@@ -0,0 +1,95 @@
+import time
+from contextlib import contextmanager
+from prometheus_client import Counter, Gauge, Histogram
+
+# ── Prometheus 메트릭 ────────────────────────────────
+# 링크 하나당 시간이 어디에 쓰이는지 보고 단계별 동시 처리 수를 정하기 위한 것
+STAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+
+STAGE_SECONDS = Histogram(
+    "bot_stage_duration_seconds",
+    "파이프라인 단계별 소요 시간",
+    ["stage"],  # transcript_fetch / whisper / summarize / db_insert / thumbnail_upload
+    buckets=STAGE_BUCKETS,
+)
+JOB_STAGE_SECONDS = Histogram(
+    "bot_job_stage_duration_seconds",
+    "작업 큐 단계(transcript/summarize/persist/thumbnail) 처리 시간",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+STAGE_ERRORS = Counter("bot_stage_errors_total", "단계별 오류 수", ["stage"])
+QUEUE_DEPTH = Gauge("bot_queue_depth", "단계별 대기/진행 중 작업 수", ["stage"])
+
+OPENAI_TOKENS = Counter("bot_openai_tokens_total", "OpenAI 토큰 사용량", ["model", "kind"])
+OPENAI_REQUESTS = Counter("bot_openai_requests_total", "OpenAI 호출 수", ["model", "status"])
+# 모델 라우팅 기준(SMALL_MODEL_MAX_INPUT 등) 조정용: 모델·용도별 지연과 입력 크기
+OPENAI_SECONDS = Histogram(
+    "bot_openai_request_seconds", "OpenAI 호출 전체 시간", ["model", "purpose"], buckets=STAGE_BUCKETS,
+)
+OPENAI_FIRST_TOKEN_SECONDS = Histogram(
+    "bot_openai_first_token_seconds", "스트리밍 첫 토큰까지 시간", ["model", "purpose"], buckets=STAGE_BUCKETS,
+)
+OPENAI_INPUT_TOKENS = Histogram(
+    "bot_openai_input_tokens", "호출 전 계산한 본문 토큰 수", ["model", "purpose"],
+    buckets=(250, 500, 1000, 1500, 2500, 5000, 10000, 20000, 40000),
+)
+OPENAI_TRUNCATED = Counter("bot_openai_truncated_total", "max_tokens에서 잘린 응답 수", ["model", "purpose"])
+APIFY_RUNS = Counter("bot_apify_runs_total", "Apify 액터 실행 수", ["actor", "status"])
+
+TRANSCRIPT_SOURCE_SECONDS = Histogram(
+    "bot_transcript_source_seconds",
+    "트랜스크립트 소스별 응답 시간 (재시도 포함)",
+    ["source"],
+    buckets=STAGE_BUCKETS,
+)
+TRANSCRIPT_SOURCE_ITEMS = Counter(
+    "bot_transcript_source_items_total",
+    "트랜스크립트 소스별 영상 결과 수",
+    ["source", "status"],
+)
+# 자막 정리(transcripts.clean_transcript) 후 남은 비율 = 정리 후 글자 수 / 원문 글자 수
+TRANSCRIPT_CLEAN_RATIO = Histogram(
+    "bot_transcript_clean_ratio", "자막 정리 후 남은 글자 비율", ["source_type"],
+    buckets=(0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 1.0),
+)
+
+
+@contextmanager
+def timed(stage: str):
+    """with timed("summarize"): ... → 소요 시간 기록, 예외 시 오류 카운트"""
+    start = time.monotonic()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.labels(stage).inc()
+        raise
+    finally:
+        STAGE_SECONDS.labels(stage).observe(time.monotonic() - start)
+
+
+def record_usage(model: str, usage):
+    if usage is None:
+        return
+    OPENAI_TOKENS.labels(model, "prompt").inc(usage.prompt_tokens or 0)
+    OPENAI_TOKENS.labels(model, "completion").inc(usage.completion_tokens or 0)
+    # 프롬프트 캐시 적중분 (system 지시문 재사용 확인용)
+    details = getattr(usage, "prompt_tokens_details", None)
+    OPENAI_TOKENS.labels(model, "cached").inc(getattr(details, "cached_tokens", None) or 0)
+
+
+def record_transcript_source(source: str, latency: float, ok: int, fail: int):
+    TRANSCRIPT_SOURCE_SECONDS.labels(source).observe(latency)
+    TRANSCRIPT_SOURCE_ITEMS.labels(source, "ok").inc(ok)
+    TRANSCRIPT_SOURCE_ITEMS.labels(source, "missing").inc(fail)
+
+
+def record_transcript_clean(source_type: str, raw_chars: int, chars: int) -> float:
+    ratio = chars / raw_chars if raw_chars else 1.0
+    TRANSCRIPT_CLEAN_RATIO.labels(source_type).observe(ratio)
+    return ratio
+
+
+def update_queue_depth(counts: dict, stages: list):
+    for stage in stages:
+        QUEUE_DEPTH.labels(stage).set(counts.get(stage, 0))
@@ -0,0 +1,45 @@
+import time
+
+# ── 채팅별 속도 제한 ─────────────────────────────────
+# 거절 대신 "언제 시작할 수 있는지"를 돌려줌 → 작업 큐의 not_before로 뒤로 미룸
+
+
+class TokenBucket:
+    """capacity개까지 모아 둘 수 있고 초당 rate개씩 충전. 모자라면 빚을 지고 그만큼 기다림"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, n: int) -> list:
+        """토큰 n개 예약 → 각 토큰을 쓸 수 있을 때까지 남은 초 목록"""
+        self.refill()
+        delays = []
+        for _ in range(n):
+            self.tokens -= 1
+            delays.append(max(0.0, -self.tokens / self.rate))
+        return delays
+
+
+class ChatLimiter:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.buckets = {}  # chat_id → TokenBucket
+
+    def reserve(self, chat_id: int, n: int) -> list:
+        if len(self.buckets) > 1000:
+            # 가득 찬 버킷은 새로 만든 것과 같으므로 정리
+            for key, bucket in list(self.buckets.items()):
+                bucket.refill()
+                if bucket.tokens >= bucket.capacity:
+                    del self.buckets[key]
+        bucket = self.buckets.setdefault(chat_id, TokenBucket(self.rate, self.capacity))
+        return bucket.reserve(n)
@@ -0,0 +1,93 @@
+import math, heapq, threading
+
+# ── 관련 영상 인덱스 ─────────────────────────────────
+# 태그 동시 출현 기반: 요약마다 IDF 가중 태그 벡터 + 태그 → 요약 역색인을 메모리에 두고
+# 같은 태그를 가진 요약만 훑어 코사인 유사도 top-k → 상세 보기마다 테이블을 다시 읽지 않음
+
+COMMON_TAG_RATIO = 0.05  # 전체의 이 비율보다 많은 요약에 붙은 태그는 후보를 넓히는 데 쓰지 않음
+COMMON_TAG_MIN   = 200
+
+
+class RelatedIndex:
+    def __init__(self):
+        self.items = {}     # id → 카드용 행 (CARD_COLUMNS)
+        self.postings = {}  # 태그 → id 집합
+        self.latest = ""    # 색인된 가장 최근 created_at (새 행만 가져올 때 기준)
+        self.synced = 0.0   # 마지막으로 새 행을 확인한 시각 (store.sync_related_index)
+        self.cache = {}     # (id, 태그, k) → top-k 결과. 색인이 바뀌면 비움
+        self.idf = {}       # 태그 → IDF, 요약 id → 태그 벡터 크기 (_prepare, 색인이 바뀌면 다시 계산)
+        self.norms = None
+        self.lock = threading.Lock()  # Streamlit 세션(스레드)들이 같은 인덱스를 공유
+
+    def __len__(self):
+        return len(self.items)
+
+    def add(self, row: dict):
+        with self.lock:
+            self._remove(row["id"])
+            self.items[row["id"]] = row
+            for tag in set(row.get("tags") or []):
+                self.postings.setdefault(tag, set()).add(row["id"])
+            self.latest = max(self.latest, row.get("created_at") or "")
+            self.cache.clear()
+            self.norms = None
+
+    def remove(self, item_id: str):
+        with self.lock:
+            self._remove(item_id)
+            self.cache.clear()
+            self.norms = None
+
+    def _remove(self, item_id: str):
+        row = self.items.pop(item_id, None)
+        if not row:
+            return
+        for tag in set(row.get("tags") or []):
+            ids = self.postings.get(tag)
+            if ids is not None:
+                ids.discard(item_id)
+                if not ids:
+                    del self.postings[tag]
+
+    def _prepare(self):
+        # 요약이 추가/삭제되면 IDF와 벡터 크기를 한 번에 다시 계산 (조회마다 계산하지 않도록)
+        if self.norms is not None:
+            return
+        total = len(self.items)
+        # 흔한 태그(예: 유튜브)가 겹치는 것보다 드문 태그가 겹치는 쪽이 더 관련 있음
+        self.idf = {tag: math.log(1 + total / len(ids)) for tag, ids in self.postings.items()}
+        self.norms = {
+            item_id: math.sqrt(sum(self.idf[t] ** 2 for t in set(row.get("tags") or []))) or 1.0
+            for item_id, row in self.items.items()
+        }
+
+    def top_k(self, item_id: str, tags: list, k: int = 5) -> list:
+        """tags가 겹치는 요약 중 유사도 상위 k개 (동점이면 최신순). 아직 색인 전인 새 요약도 tags로 조회 가능"""
+        with self.lock:
+            tags = [t for t in set(tags or []) if t in self.postings]
+            key = (item_id, tuple(sorted(tags)), k)
+            if key in self.cache:
+                return self.cache[key]
+            self._prepare()
+            # 드문 태그부터: 후보는 드문 태그의 역색인에서만 모으고, 아주 흔한 태그는
+            # 이미 모은 후보에 점수만 더함 (후보가 k개보다 적으면 흔한 태그에서도 모음)
+            tags.sort(key=lambda t: len(self.postings[t]))
+            common = max(COMMON_TAG_MIN, len(self.items) * COMMON_TAG_RATIO)
+            scores = {}
+            for tag in tags:
+                weight = self.idf[tag] ** 2
+                ids = self.postings[tag]
+                if len(ids) > common and len(scores) > k:
+                    for other in scores:
+                        if other in ids:
+                            scores[other] += weight
+                    continue
+                for other in ids:
+                    scores[other] = scores.get(other, 0.0) + weight
+            scores.pop(item_id, None)
+            best = heapq.nlargest(k, scores, key=lambda other: (
+                scores[other] / self.norms[other], self.items[other].get("created_at") or "",
+            ))
+            result = [self.items[other] for other in best]
+            self.cache[key] = result
+            return result
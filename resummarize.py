@@ -0,0 +1,313 @@
+import os, json, time, asyncio, argparse, tempfile
+from supabase import create_client
+import summarizer
+from transcripts import load_transcript
+
+# ── 전체 아카이브 재요약 / 재태깅 ───────────────────
+# 프롬프트(YOUTUBE_PROMPT, INSTAGRAM_PROMPT)나 parse_tags / parse_title 규칙을 바꾼 뒤 기존 행을 다시 처리.
+# 봇과 같은 요약 코드(summarizer.py의 summarize / parse_*)를 그대로 사용. sql/008 적용 필요
+# 봇 모듈은 import하지 않으므로 봇이 도는 환경에서 실행해도 작업 큐(jobs.db)를 건드리지 않음
+# 필요한 환경 변수: SUPABASE_URL, SUPABASE_KEY, OPENAI_API_KEY (+ 봇과 같은 SUMMARY_* 설정)
+#   python resummarize.py --dry-run --limit 5      # 저장 없이 몇 개만 새 결과 미리보기
+#   python resummarize.py --source youtube         # 온라인 재요약. 중단 후 다시 실행하면 체크포인트부터 이어서
+#   python resummarize.py --tags-only              # 모델 호출 없이 저장된 요약에서 제목/태그만 다시 파싱
+#   python resummarize.py --retry-failed           # 지난 실행에서 실패한 행만 다시
+#   python resummarize.py --batch-api              # OpenAI Batch API로 제출 (24시간 내 처리, 단가 절반)
+#   python resummarize.py --collect                # 끝난 배치 결과를 받아 저장
+
+BATCH_MAX_REQUESTS = 50000              # Batch API 파일 1개당 요청 수 한도
+BATCH_MAX_BYTES    = 150 * 1024 * 1024  # 파일 크기 한도(200MB)보다 여유 있게
+
+supabase = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_KEY"])
+
+
+# ── 체크포인트 ──────────────────────────────────────
+def load_checkpoint(path: str) -> dict:
+    state = {"last_id": None, "done": 0, "skipped": 0, "failed": [], "batches": []}
+    if os.path.exists(path):
+        with open(path) as f:
+            state.update(json.load(f))
+    return state
+
+def save_checkpoint(path: str, state: dict):
+    # 쓰는 도중 죽어도 이전 체크포인트가 깨지지 않도록 임시 파일 → 교체
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+
+# ── 읽기 / 쓰기 ──────────────────────────────────────
+COLUMNS = "id, source_type, title, summary_text, tags"
+
+def fetch_page(after, source: str, size: int) -> list:
+    # id 순 키셋 페이지 → 체크포인트는 마지막으로 끝낸 id 하나면 충분
+    query = supabase.table("youtube_summaries").select(COLUMNS).order("id").limit(size)
+    if after:
+        query = query.gt("id", after)
+    if source:
+        query = query.eq("source_type", source)
+    return query.execute().data or []
+
+def fetch_rows(ids: list) -> list:
+    res = supabase.table("youtube_summaries").select(COLUMNS).in_("id", ids).order("id").execute()
+    return res.data or []
+
+def load_content(item_id: str) -> str:
+    # 대시보드 store.fetch_transcript와 같은 순서: 압축 저장본 → 백필 전이면 예전 컬럼
+    text = load_transcript(supabase, item_id)
+    if text is None:
+        res = supabase.table("youtube_summaries").select("video_stt_url").eq("id", item_id).execute()
+        text = (res.data[0].get("video_stt_url") if res.data else None) or ""
+    # 봇이 요약할 때 넣은 것과 같은 원문 (인스타그램 캡션은 정리하지 않음)
+    return text
+
+def write_updates(updates: list) -> int:
+    """update_summaries RPC 한 번으로 여러 행 수정 → 실제로 바뀐 행 수"""
+    if not updates:
+        return 0
+    return supabase.rpc("update_summaries", {"p_rows": updates}).execute().data or 0
+
+def changes(row: dict, summary: str) -> dict:
+    return {
+        "id":           row["id"],
+        "title":        summarizer.parse_title(summary),
+        "summary_text": summary,
+        "tags":         summarizer.parse_tags(summary),
+    }
+
+def preview(row: dict, new: dict):
+    print(f"  {row['id']}: {row['title']!r} → {new['title']!r}")
+    print(f"    태그 {row.get('tags') or []} → {new['tags']}")
+
+def source_of(row: dict) -> str:
+    return row.get("source_type") or "youtube"
+
+
+# ── 온라인 재요약 ────────────────────────────────────
+async def pages(args, state: dict):
+    """처리할 행을 페이지 단위로. --retry-failed면 지난 실패 목록만"""
+    if args.retry_failed:
+        ids = list(state["failed"])
+        for i in range(0, len(ids), args.page):
+            yield await asyncio.to_thread(fetch_rows, ids[i:i + args.page])
+        return
+    after, seen = state["last_id"], 0
+    while not args.limit or seen < args.limit:
+        size = min(args.page, args.limit - seen) if args.limit else args.page
+        rows = await asyncio.to_thread(fetch_page, after, args.source, size)
+        if not rows:
+            return
+        seen += len(rows)
+        after = rows[-1]["id"]
+        yield rows
+
+async def run_online(args, state: dict):
+    semaphore = asyncio.Semaphore(args.concurrency)  # 행 단위 동시 처리 (OpenAI 호출은 summarizer의 OPENAI_CONCURRENCY 상한도 적용)
+
+    async def process(row: dict):
+        async with semaphore:
+            if args.tags_only:
+                summary = row.get("summary_text") or ""
+            else:
+                content = await asyncio.to_thread(load_content, row["id"])
+                if not content:
+                    return None
+                summary = await summarizer.summarize(content, source_of(row))
+            return changes(row, summary) if summary else None
+
+    start = time.time()
+    async for rows in pages(args, state):
+        results = await asyncio.gather(*(process(row) for row in rows), return_exceptions=True)
+        updates, failed, skipped = [], [], 0
+        for row, result in zip(rows, results):
+            if isinstance(result, Exception):
+                print(f"  실패 {row['id']}: {result}")
+                failed.append(row["id"])
+            elif result is None:
+                skipped += 1  # 스크립트 없음
+            else:
+                updates.append(result)
+                if args.dry_run or args.verbose:
+                    preview(row, result)
+        if args.dry_run:
+            print(f"[dry-run] {len(updates)}행 처리 (저장 안 함), 건너뜀 {skipped}, 실패 {len(failed)}")
+            continue
+        changed = await asyncio.to_thread(write_updates, updates)
+        done_ids = {u["id"] for u in updates}
+        if args.retry_failed:
+            state["failed"] = [i for i in state["failed"] if i not in done_ids]
+        else:
+            state["last_id"] = rows[-1]["id"]
+            state["failed"] += failed
+        state["done"] += len(updates)
+        state["skipped"] += skipped
+        save_checkpoint(args.checkpoint, state)
+        print(f"{state['done']}행 완료 (이번 페이지 변경 {changed}), 건너뜀 {state['skipped']}, "
+              f"실패 {len(state['failed'])} · {time.time() - start:.0f}초")
+
+
+# ── OpenAI Batch API ─────────────────────────────────
+def batch_request(row: dict, content: str) -> dict:
+    # 온라인 summarize와 같은 모델 선택 / 출력 예산 / 메시지 (긴 원문의 구간 요약은 제외)
+    source_type = source_of(row)
+    prompt = summarizer.SUMMARY_PROMPTS[source_type]
+    tokens = summarizer.count_tokens(content)
+    return {
+        "custom_id": row["id"],
+        "method": "POST",
+        "url": "/v1/chat/completions",
+        "body": {
+            "model": summarizer.pick_model(tokens),
+            "max_tokens": summarizer.output_budget(tokens, prompt["min_tokens"]),
+            "messages": [
+                {"role": "system", "content": prompt["system"]},
+                {"role": "user", "content": summarizer.summary_input(content, source_type)},
+            ],
+            "prompt_cache_key": f"summary-{source_type}",
+        },
+    }
+
+async def submit_file(args, state: dict, path: str, count: int, last_id):
+    if args.dry_run:
+        print(f"[dry-run] 배치 파일 {count}건, {os.path.getsize(path):,}B (제출 안 함)")
+        return
+    with open(path, "rb") as f:
+        uploaded = await summarizer.ai.files.create(file=f, purpose="batch")
+    batch = await summarizer.ai.batches.create(
+        input_file_id=uploaded.id, endpoint="/v1/chat/completions", completion_window="24h",
+    )
+    # 제출까지 끝난 행만 체크포인트에 반영 (파일을 만들다 죽으면 그 구간은 다시 제출)
+    state["batches"].append({"id": batch.id, "requests": count, "collected": False})
+    state["last_id"] = last_id
+    save_checkpoint(args.checkpoint, state)
+    print(f"배치 제출: {batch.id} ({count}건) — 완료 후 --collect")
+
+async def run_batch_submit(args, state: dict):
+    # 한 번에 요약되는 행은 배치 파일로, 구간 요약(map-reduce)이 필요한 긴 원문은 여기서 바로 온라인 처리
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def summarize_now(row: dict, content: str):
+        async with semaphore:
+            return changes(row, await summarizer.summarize(content, source_of(row)))
+
+    tmpdir = tempfile.mkdtemp(prefix="resummarize-")
+    path = os.path.join(tmpdir, "batch.jsonl")
+    out = open(path, "w")
+    count, last_id = 0, None
+    async for rows in pages(args, state):
+        contents = await asyncio.gather(*(asyncio.to_thread(load_content, row["id"]) for row in rows))
+        long_rows = []
+        for row, content in zip(rows, contents):
+            if not content:
+                state["skipped"] += 1
+            elif len(content) > summarizer.SUMMARY_CHUNK_CHARS:
+                long_rows.append((row, content))
+            else:
+                line = json.dumps(batch_request(row, content), ensure_ascii=False) + "\n"
+                if count and (count >= BATCH_MAX_REQUESTS or out.tell() + len(line.encode()) > BATCH_MAX_BYTES):
+                    out.close()
+                    await submit_file(args, state, path, count, last_id)
+                    out, count = open(path, "w"), 0
+                out.write(line)
+                count += 1
+        last_id = rows[-1]["id"]
+
+        if args.dry_run:
+            if long_rows:
+                print(f"[dry-run] 긴 원문 {len(long_rows)}행 온라인 처리 대상 (호출 안 함)")
+            continue
+        results = await asyncio.gather(*(summarize_now(row, c) for row, c in long_rows), return_exceptions=True)
+        updates = []
+        for (row, _), result in zip(long_rows, results):
+            if isinstance(result, Exception):
+                print(f"  실패 {row['id']}: {result}")
+                state["failed"].append(row["id"])
+            else:
+                updates.append(result)
+        if updates:
+            await asyncio.to_thread(write_updates, updates)
+            state["done"] += len(updates)
+        if long_rows:
+            print(f"긴 원문 {len(long_rows)}행 온라인 처리 (실패 {len(long_rows) - len(updates)})")
+        # 페이지마다 저장. 아직 제출하지 않은 배치 파일에 든 행이 있으면 last_id는 마지막 제출 지점에 둠
+        if not count:
+            state["last_id"] = last_id
+        save_checkpoint(args.checkpoint, state)
+    out.close()
+    if count:
+        await submit_file(args, state, path, count, last_id)
+    os.remove(path)
+    os.rmdir(tmpdir)
+
+
+async def run_collect(args, state: dict):
+    for entry in state["batches"]:
+        if entry.get("collected"):
+            continue
+        batch = await summarizer.ai.batches.retrieve(entry["id"])
+        counts = batch.request_counts
+        print(f"{entry['id']}: {batch.status} ({counts.completed}/{counts.total} 완료, 실패 {counts.failed})")
+        if batch.status in ("failed", "expired", "cancelled") and not batch.output_file_id:
+            entry["collected"] = True  # 다시 확인할 필요 없음. 해당 행은 --batch-api로 다시 제출
+            continue
+        if batch.status not in ("completed", "expired", "cancelled"):
+            continue  # 아직 처리 중 (expired/cancelled도 끝난 요청의 결과는 받음)
+
+        updates, failed = [], []
+        output = await summarizer.ai.files.content(batch.output_file_id) if batch.output_file_id else None
+        for line in (output.text.splitlines() if output else []):
+            record = json.loads(line)
+            response = record.get("response") or {}
+            if record.get("error") or response.get("status_code") != 200:
+                failed.append(record["custom_id"])
+                continue
+            choice = response["body"]["choices"][0]
+            if choice.get("finish_reason") == "length":
+                print(f"  {record['custom_id']}: max_tokens에서 잘림")
+            updates.append(changes({"id": record["custom_id"]}, choice["message"]["content"]))
+        if batch.error_file_id:
+            errors = await summarizer.ai.files.content(batch.error_file_id)
+            failed += [json.loads(line)["custom_id"] for line in errors.text.splitlines() if line.strip()]
+
+        if args.dry_run:
+            print(f"[dry-run] {len(updates)}행 결과, 실패 {len(failed)} (저장 안 함)")
+            continue
+        changed = 0
+        for i in range(0, len(updates), args.page):
+            changed += await asyncio.to_thread(write_updates, updates[i:i + args.page])
+        entry["collected"] = True
+        state["done"] += len(updates)
+        state["failed"] += failed
+        save_checkpoint(args.checkpoint, state)
+        print(f"  {len(updates)}행 저장 (변경 {changed}), 실패 {len(failed)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="저장된 스크립트로 요약/제목/태그 다시 만들기")
+    parser.add_argument("--source", choices=["youtube", "instagram"], help="이 소스만")
+    parser.add_argument("--limit", type=int, default=0, help="최대 행 수 (0이면 전체)")
+    parser.add_argument("--page", type=int, default=50, help="한 번에 읽고 일괄 저장할 행 수")
+    parser.add_argument("--concurrency", type=int, default=4, help="동시에 요약할 행 수")
+    parser.add_argument("--checkpoint", default="resummarize.checkpoint.json", help="진행 상황 파일")
+    parser.add_argument("--reset", action="store_true", help="체크포인트 무시하고 처음부터")
+    parser.add_argument("--dry-run", action="store_true", help="저장/제출 없이 결과만 출력")
+    parser.add_argument("--verbose", action="store_true", help="바뀌는 제목/태그 출력")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--tags-only", action="store_true", help="모델 호출 없이 저장된 요약을 다시 파싱")
+    mode.add_argument("--retry-failed", action="store_true", help="체크포인트의 실패 행만 다시")
+    mode.add_argument("--batch-api", action="store_true", help="OpenAI Batch API로 제출")
+    mode.add_argument("--collect", action="store_true", help="제출한 배치 결과 받아서 저장")
+    args = parser.parse_args()
+
+    state = load_checkpoint("" if args.reset else args.checkpoint)
+    if args.collect:
+        asyncio.run(run_collect(args, state))
+    elif args.batch_api:
+        asyncio.run(run_batch_submit(args, state))
+    else:
+        asyncio.run(run_online(args, state))
+
+
+if __name__ == "__main__":
+    main()
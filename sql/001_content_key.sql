@@ -0,0 +1,19 @@
+-- 같은 영상/게시물 재요청 시 기존 요약을 재사용하기 위한 정규화 키
+-- yt:<video_id> / ig:<shortcode>
+alter table youtube_summaries add column if not exists content_key text;
+
+create index if not exists youtube_summaries_content_key_idx
+    on youtube_summaries (content_key, created_at desc);
+
+-- 기존 행 백필
+update youtube_summaries
+   set content_key = 'yt:' || substring(youtube_url from '(?:v=|youtu\.be/|shorts/|embed/)([A-Za-z0-9_-]{11})')
+ where content_key is null
+   and source_type = 'youtube'
+   and youtube_url ~ '(?:v=|youtu\.be/|shorts/|embed/)[A-Za-z0-9_-]{11}';
+
+update youtube_summaries
+   set content_key = 'ig:' || substring(coalesce(instagram_url, youtube_url) from 'instagram\.com/(?:[A-Za-z0-9_.]+/)?(?:p|reels?|tv)/([A-Za-z0-9_-]+)')
+ where content_key is null
+   and source_type = 'instagram'
+   and coalesce(instagram_url, youtube_url) ~ 'instagram\.com/(?:[A-Za-z0-9_.]+/)?(?:p|reels?|tv)/[A-Za-z0-9_-]+';
@@ -0,0 +1,27 @@
+-- 챗봇용 STT 청크 임베딩 인덱스 (pgvector)
+-- 요약 1건당 한 번만 청크/임베딩을 만들고, 질문마다 top-k 청크만 프롬프트에 넣음
+create extension if not exists vector;
+
+create table if not exists summary_chunks (
+    summary_id uuid         not null references youtube_summaries (id) on delete cascade,
+    idx        int          not null,
+    content    text         not null,
+    embedding  vector(1536) not null,  -- text-embedding-3-small
+    primary key (summary_id, idx)
+);
+
+-- 한 요약의 청크는 수십 개 수준이라 summary_id로 좁힌 뒤 정렬하면 충분 (ANN 인덱스 불필요)
+create or replace function match_summary_chunks(
+    p_summary_id uuid,
+    p_query      vector(1536),
+    p_count      int default 5
+)
+returns table (idx int, content text, similarity float)
+language sql stable
+as $$
+    select c.idx, c.content, 1 - (c.embedding <=> p_query) as similarity
+      from summary_chunks c
+     where c.summary_id = p_summary_id
+     order by c.embedding <=> p_query
+     limit p_count;
+$$;
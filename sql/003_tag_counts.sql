@@ -0,0 +1,44 @@
+-- 태그 → 요약 개수 인덱스. youtube_summaries insert/update/delete 시 트리거로 유지
+-- 대시보드 사이드바는 전체 테이블 대신 이 작은 테이블만 읽음
+create table if not exists tag_counts (
+    tag   text primary key,
+    count int  not null default 0
+);
+
+create or replace function youtube_summaries_tag_counts()
+returns trigger
+language plpgsql
+security definer
+as $$
+begin
+    if tg_op in ('UPDATE', 'DELETE') and old.tags is not null then
+        update tag_counts t
+           set count = t.count - 1
+          from (select distinct unnest(old.tags) as tag) o
+         where t.tag = o.tag;
+    end if;
+
+    if tg_op in ('INSERT', 'UPDATE') and new.tags is not null then
+        insert into tag_counts (tag, count)
+        select distinct unnest(new.tags), 1
+        on conflict (tag) do update set count = tag_counts.count + 1;
+    end if;
+
+    delete from tag_counts where count <= 0;
+    return null;
+end;
+$$;
+
+drop trigger if exists youtube_summaries_tag_counts on youtube_summaries;
+create trigger youtube_summaries_tag_counts
+    after insert or delete or update of tags on youtube_summaries
+    for each row execute function youtube_summaries_tag_counts();
+
+-- 기존 행 백필
+truncate tag_counts;
+insert into tag_counts (tag, count)
+select tag, count(*)
+  from (select distinct id, unnest(tags) as tag from youtube_summaries) t
+ group by tag;
+
+grant select on tag_counts to anon, authenticated;
@@ -0,0 +1,7 @@
+-- 대시보드 키셋 페이지네이션 (created_at desc, id desc) 용 인덱스
+create index if not exists youtube_summaries_created_id_idx
+    on youtube_summaries (created_at desc, id desc);
+
+-- 태그 필터 (tags @> '{태그}')
+create index if not exists youtube_summaries_tags_idx
+    on youtube_summaries using gin (tags);
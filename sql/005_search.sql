@@ -0,0 +1,133 @@
+-- 제목 · 요약 · 스크립트 전문 검색
+-- 한국어는 조사가 붙어 공백 단위 토큰이 잘 안 맞으므로 2글자(bigram) n-gram으로 색인
+-- (ilike '%q%' 는 B-tree를 못 타고 제목만 검색했음)
+create table if not exists summary_search (
+    summary_id uuid     primary key references youtube_summaries (id) on delete cascade,
+    doc        text     not null,   -- 스니펫용 원문 (제목 / 요약 / 스크립트)
+    tsv        tsvector not null
+);
+create index if not exists summary_search_tsv_idx on summary_search using gin (tsv);
+
+create or replace function korean_bigrams(p text)
+returns text[]
+language sql immutable
+as $$
+    select coalesce(array_agg(distinct substr(w, i, 2)), '{}')
+      from regexp_split_to_table(lower(coalesce(p, '')), '[^[:alnum:]가-힣]+') as w,
+           generate_series(1, greatest(char_length(w) - 1, 1)) as i
+     where w <> '';
+$$;
+
+-- 가중치는 위치에만 붙으므로 bigram마다 위치를 줘서 만듦 (array_to_tsvector는 위치가 없어 setweight가 무시됨)
+-- lexeme은 search_tsquery와 똑같이 그대로 쓰도록 to_tsvector 대신 'lexeme':위치 형식으로 캐스팅
+create or replace function bigram_tsvector(p text)
+returns tsvector
+language sql immutable
+as $$
+    select coalesce(string_agg(quote_literal(g) || ':' || i, ' '), '')::tsvector
+      from unnest(korean_bigrams(p)) with ordinality as t(g, i);
+$$;
+
+create or replace function search_tsvector(p_title text, p_summary text, p_transcript text)
+returns tsvector
+language sql immutable
+as $$
+    select setweight(bigram_tsvector(p_title), 'A')
+        || setweight(bigram_tsvector(p_summary), 'B')
+        || setweight(bigram_tsvector(p_transcript), 'C');
+$$;
+
+-- 검색어의 모든 bigram을 포함하는 문서 (lexeme은 그대로 쓰도록 tsquery로 직접 캐스팅)
+create or replace function search_tsquery(p_query text)
+returns tsquery
+language sql immutable
+as $$
+    select coalesce(string_agg(quote_literal(g), ' & '), '')::tsquery
+      from unnest(korean_bigrams(p_query)) as g;
+$$;
+
+create or replace function search_snippet(p_doc text, p_query text, p_radius int default 60)
+returns text
+language sql immutable
+as $$
+    with p as (
+        select coalesce(
+            nullif(strpos(lower(p_doc), lower(p_query)), 0),
+            nullif(strpos(lower(p_doc), lower(split_part(trim(p_query), ' ', 1))), 0),
+            0
+        ) as pos
+    )
+    select case
+        when pos = 0 then left(p_doc, 2 * p_radius)
+        else case when pos > p_radius then '…' else '' end
+             || substr(p_doc, greatest(pos - p_radius, 1), char_length(p_query) + 2 * p_radius)
+    end || '…'
+      from p;
+$$;
+
+create or replace function youtube_summaries_search_sync()
+returns trigger
+language plpgsql
+security definer
+as $$
+begin
+    insert into summary_search (summary_id, doc, tsv)
+    values (
+        new.id,
+        concat_ws(E'\n', new.title, new.summary_text, new.video_stt_url),
+        search_tsvector(new.title, new.summary_text, new.video_stt_url)
+    )
+    on conflict (summary_id) do update set doc = excluded.doc, tsv = excluded.tsv;
+    return null;
+end;
+$$;
+
+drop trigger if exists youtube_summaries_search_sync on youtube_summaries;
+create trigger youtube_summaries_search_sync
+    after insert or update of title, summary_text, video_stt_url on youtube_summaries
+    for each row execute function youtube_summaries_search_sync();
+
+-- 순위: bigram 일치도(제목 > 요약 > 스크립트) + 검색어가 그대로 들어 있으면 가산점
+create or replace function search_summaries(
+    p_query  text,
+    p_tag    text default null,
+    p_limit  int  default 15,
+    p_offset int  default 0
+)
+returns table (
+    id            uuid,
+    title         text,
+    thumbnail_url text,
+    tags          text[],
+    created_at    timestamptz,
+    source_type   text,
+    snippet       text,
+    rank          real,
+    total         bigint
+)
+language sql stable
+as $$
+    with hits as (
+        select s.summary_id,
+               s.doc,
+               ts_rank(s.tsv, search_tsquery(p_query))
+                 + case when strpos(lower(s.doc), lower(p_query)) > 0 then 1 else 0 end as rank
+          from summary_search s
+         where s.tsv @@ search_tsquery(p_query)
+    )
+    select y.id, y.title, y.thumbnail_url, y.tags, y.created_at, y.source_type,
+           search_snippet(h.doc, p_query), h.rank::real, count(*) over ()
+      from hits h
+      join youtube_summaries y on y.id = h.summary_id
+     where p_tag is null or y.tags @> array[p_tag]
+     order by h.rank desc, y.created_at desc
+     limit p_limit offset p_offset;
+$$;
+
+-- 기존 행 백필
+insert into summary_search (summary_id, doc, tsv)
+select id,
+       concat_ws(E'\n', title, summary_text, video_stt_url),
+       search_tsvector(title, summary_text, video_stt_url)
+  from youtube_summaries
+on conflict (summary_id) do nothing;
@@ -0,0 +1,41 @@
+-- 그리드 카드용 작은 WebP 썸네일 (thumbnail_url은 상세 보기용)
+alter table youtube_summaries add column if not exists thumbnail_grid_url text;
+
+-- 검색 결과 카드도 같은 컬럼을 쓰도록 반환 타입 변경
+drop function if exists search_summaries(text, text, int, int);
+create function search_summaries(
+    p_query  text,
+    p_tag    text default null,
+    p_limit  int  default 15,
+    p_offset int  default 0
+)
+returns table (
+    id                 uuid,
+    title              text,
+    thumbnail_url      text,
+    thumbnail_grid_url text,
+    tags               text[],
+    created_at         timestamptz,
+    source_type        text,
+    snippet            text,
+    rank               real,
+    total              bigint
+)
+language sql stable
+as $$
+    with hits as (
+        select s.summary_id,
+               s.doc,
+               ts_rank(s.tsv, search_tsquery(p_query))
+                 + case when strpos(lower(s.doc), lower(p_query)) > 0 then 1 else 0 end as rank
+          from summary_search s
+         where s.tsv @@ search_tsquery(p_query)
+    )
+    select y.id, y.title, y.thumbnail_url, y.thumbnail_grid_url, y.tags, y.created_at, y.source_type,
+           search_snippet(h.doc, p_query), h.rank::real, count(*) over ()
+      from hits h
+      join youtube_summaries y on y.id = h.summary_id
+     where p_tag is null or y.tags @> array[p_tag]
+     order by h.rank desc, y.created_at desc
+     limit p_limit offset p_offset;
+$$;
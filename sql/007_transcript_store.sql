@@ -0,0 +1,131 @@
+-- 전체 스크립트를 youtube_summaries 밖으로 분리 + 압축 저장
+-- 목록/태그/개수 조회가 읽는 본 테이블 행은 작게 유지하고,
+-- 스크립트는 상세 보기의 📄 전체 STT 탭과 챗봇에서만 summary_id로 가져옴
+create table if not exists summary_transcripts (
+    summary_id uuid        primary key references youtube_summaries (id) on delete cascade,
+    encoding   text        not null check (encoding in ('gzip', 'zstd')),
+    data       bytea       not null,   -- 클라이언트(transcripts.py)에서 압축한 UTF-8 텍스트
+    raw_chars  int         not null,
+    created_at timestamptz not null default now()
+);
+-- 이미 압축된 바이트라 TOAST가 다시 압축을 시도하지 않도록
+alter table summary_transcripts alter column data set storage external;
+
+-- 검색: 스크립트가 본 테이블에 없으므로 색인용 원문은 summary_search에 따로 보관
+alter table summary_search add column if not exists transcript text not null default '';
+
+update summary_search s
+   set doc = concat_ws(E'\n', y.title, y.summary_text),
+       transcript = y.video_stt_url
+  from youtube_summaries y
+ where y.id = s.summary_id
+   and y.video_stt_url is not null;
+
+-- 제목/요약이 바뀌면 (재요약 등) 보관해 둔 스크립트와 함께 다시 색인
+create or replace function youtube_summaries_search_sync()
+returns trigger
+language plpgsql
+security definer
+as $$
+begin
+    insert into summary_search (summary_id, doc, tsv, transcript)
+    values (
+        new.id,
+        concat_ws(E'\n', new.title, new.summary_text),
+        search_tsvector(new.title, new.summary_text, new.video_stt_url),
+        coalesce(new.video_stt_url, '')
+    )
+    on conflict (summary_id) do update
+        set doc = excluded.doc,
+            tsv = search_tsvector(new.title, new.summary_text, coalesce(new.video_stt_url, summary_search.transcript)),
+            transcript = coalesce(new.video_stt_url, summary_search.transcript);
+    return null;
+end;
+$$;
+
+drop trigger if exists youtube_summaries_search_sync on youtube_summaries;
+create trigger youtube_summaries_search_sync
+    after insert or update of title, summary_text on youtube_summaries
+    for each row execute function youtube_summaries_search_sync();
+
+-- 봇 저장 / 백필 공용: 압축본 저장 + 검색 색인 갱신 + 본 테이블의 인라인 스크립트 비우기
+create or replace function save_transcript(
+    p_summary_id uuid,
+    p_encoding   text,
+    p_data       text,   -- base64
+    p_raw_chars  int,
+    p_text       text    -- 검색 색인용 원문
+)
+returns void
+language plpgsql
+security definer
+as $$
+begin
+    insert into summary_transcripts (summary_id, encoding, data, raw_chars)
+    values (p_summary_id, p_encoding, decode(p_data, 'base64'), p_raw_chars)
+    on conflict (summary_id) do update
+        set encoding = excluded.encoding, data = excluded.data, raw_chars = excluded.raw_chars;
+
+    update summary_search s
+       set transcript = p_text,
+           tsv = search_tsvector(y.title, y.summary_text, p_text)
+      from youtube_summaries y
+     where s.summary_id = p_summary_id
+       and y.id = p_summary_id;
+
+    update youtube_summaries
+       set video_stt_url = null
+     where id = p_summary_id
+       and video_stt_url is not null;
+end;
+$$;
+
+create or replace function get_transcript(p_summary_id uuid)
+returns table (encoding text, data text)
+language sql stable
+as $$
+    select t.encoding, encode(t.data, 'base64')
+      from summary_transcripts t
+     where t.summary_id = p_summary_id;
+$$;
+
+-- 검색 스니펫/가산점은 제목·요약 + 보관된 스크립트 기준
+create or replace function search_summaries(
+    p_query  text,
+    p_tag    text default null,
+    p_limit  int  default 15,
+    p_offset int  default 0
+)
+returns table (
+    id                 uuid,
+    title              text,
+    thumbnail_url      text,
+    thumbnail_grid_url text,
+    tags               text[],
+    created_at         timestamptz,
+    source_type        text,
+    snippet            text,
+    rank               real,
+    total              bigint
+)
+language sql stable
+as $$
+    with hits as (
+        select s.summary_id,
+               concat_ws(E'\n', s.doc, nullif(s.transcript, '')) as doc,
+               ts_rank(s.tsv, search_tsquery(p_query))
+                 + case when strpos(lower(concat_ws(E'\n', s.doc, s.transcript)), lower(p_query)) > 0 then 1 else 0 end as rank
+          from summary_search s
+         where s.tsv @@ search_tsquery(p_query)
+    )
+    select y.id, y.title, y.thumbnail_url, y.thumbnail_grid_url, y.tags, y.created_at, y.source_type,
+           search_snippet(h.doc, p_query), h.rank::real, count(*) over ()
+      from hits h
+      join youtube_summaries y on y.id = h.summary_id
+     where p_tag is null or y.tags @> array[p_tag]
+     order by h.rank desc, y.created_at desc
+     limit p_limit offset p_offset;
+$$;
+
+-- 기존 행의 video_stt_url은 backfill_transcripts.py가 배치로 압축해 옮김 (save_transcript 호출)
+-- 백필이 끝나면 video_stt_url 컬럼은 삭제 가능
@@ -0,0 +1,21 @@
+-- 재요약/재태깅(resummarize.py)용 일괄 수정: 한 번의 요청으로 여러 행의 제목/요약/태그 갱신
+-- p_rows: [{"id": "...", "title": "...", "summary_text": "...", "tags": ["..."]}, ...]
+-- 빠진 키(null)는 기존 값 유지. 실제로 바뀐 행만 수정 → 검색/태그 개수 트리거도 그 행만 실행
+create or replace function update_summaries(p_rows jsonb)
+returns int
+language sql
+security definer
+as $$
+    with updated as (
+        update youtube_summaries y
+           set title        = coalesce(r.title, y.title),
+               summary_text = coalesce(r.summary_text, y.summary_text),
+               tags         = coalesce(r.tags, y.tags)
+          from jsonb_to_recordset(p_rows) as r (id uuid, title text, summary_text text, tags text[])
+         where y.id = r.id
+           and (y.title, y.summary_text, y.tags) is distinct from
+               (coalesce(r.title, y.title), coalesce(r.summary_text, y.summary_text), coalesce(r.tags, y.tags))
+        returning 1
+    )
+    select count(*)::int from updated;
+$$;
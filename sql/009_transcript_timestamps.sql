@@ -0,0 +1,41 @@
+-- 정리된 스크립트의 구간 타임스탬프 (transcripts.clean_transcript)
+-- [[시작 초, 스크립트 내 글자 위치], ...] — 약 30초 간격이라 스크립트 1건당 수백 바이트 수준
+alter table summary_transcripts add column if not exists timestamps jsonb;
+
+-- 인자가 추가되므로 예전 시그니처는 지우고 다시 생성 (p_timestamps 없이 호출해도 동작)
+drop function if exists save_transcript(uuid, text, text, int, text);
+
+create or replace function save_transcript(
+    p_summary_id uuid,
+    p_encoding   text,
+    p_data       text,   -- base64
+    p_raw_chars  int,
+    p_text       text,   -- 검색 색인용 원문
+    p_timestamps jsonb default null
+)
+returns void
+language plpgsql
+security definer
+as $$
+begin
+    insert into summary_transcripts (summary_id, encoding, data, raw_chars, timestamps)
+    values (p_summary_id, p_encoding, decode(p_data, 'base64'), p_raw_chars, p_timestamps)
+    on conflict (summary_id) do update
+        set encoding   = excluded.encoding,
+            data       = excluded.data,
+            raw_chars  = excluded.raw_chars,
+            timestamps = coalesce(excluded.timestamps, summary_transcripts.timestamps);
+
+    update summary_search s
+       set transcript = p_text,
+           tsv = search_tsvector(y.title, y.summary_text, p_text)
+      from youtube_summaries y
+     where s.summary_id = p_summary_id
+       and y.id = p_summary_id;
+
+    update youtube_summaries
+       set video_stt_url = null
+     where id = p_summary_id
+       and video_stt_url is not null;
+end;
+$$;
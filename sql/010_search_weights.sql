@@ -0,0 +1,25 @@
+-- 005를 이미 적용한 DB용: 제목 > 요약 > 스크립트 가중치가 실제로 순위에 반영되도록 색인 다시 만들기
+-- (예전 search_tsvector는 위치 없는 lexeme만 만들어 setweight가 무시됐고 모든 bigram이 D 가중치였음)
+-- save_transcript(007/009)와 검색 트리거는 search_tsvector를 호출하므로 함수만 바꾸면 새 행은 그대로 맞게 색인됨
+create or replace function bigram_tsvector(p text)
+returns tsvector
+language sql immutable
+as $$
+    select coalesce(string_agg(quote_literal(g) || ':' || i, ' '), '')::tsvector
+      from unnest(korean_bigrams(p)) with ordinality as t(g, i);
+$$;
+
+create or replace function search_tsvector(p_title text, p_summary text, p_transcript text)
+returns tsvector
+language sql immutable
+as $$
+    select setweight(bigram_tsvector(p_title), 'A')
+        || setweight(bigram_tsvector(p_summary), 'B')
+        || setweight(bigram_tsvector(p_transcript), 'C');
+$$;
+
+-- 기존 행 재색인 (백필 전 행은 인라인 스크립트, 옮긴 행은 summary_search에 보관된 스크립트 기준)
+update summary_search s
+   set tsv = search_tsvector(y.title, y.summary_text, coalesce(y.video_stt_url, nullif(s.transcript, '')))
+  from youtube_summaries y
+ where y.id = s.summary_id;
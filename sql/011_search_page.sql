@@ -0,0 +1,47 @@
+-- 검색 비용을 결과 페이지 크기에 맞춤
+-- 예전(005~007)에는 검색어 그대로 일치 가산점과 스니펫을 스크립트까지 포함한 원문으로
+-- LIMIT 전에 모든 일치 행에서 계산 → 넓은 검색어면 일치하는 스크립트를 전부 읽었음
+--   · 가산점: 제목·요약(summary_search.doc)에서만 → 순위 계산에 스크립트를 읽지 않음
+--   · 스니펫: 순위·태그 필터·페이지를 먼저 정한 뒤 돌려줄 행에서만 (스크립트는 여기서만 읽음)
+create or replace function search_summaries(
+    p_query  text,
+    p_tag    text default null,
+    p_limit  int  default 15,
+    p_offset int  default 0
+)
+returns table (
+    id                 uuid,
+    title              text,
+    thumbnail_url      text,
+    thumbnail_grid_url text,
+    tags               text[],
+    created_at         timestamptz,
+    source_type        text,
+    snippet            text,
+    rank               real,
+    total              bigint
+)
+language sql stable
+as $$
+    with hits as (
+        select s.summary_id,
+               ts_rank(s.tsv, search_tsquery(p_query))
+                 + case when strpos(lower(s.doc), lower(p_query)) > 0 then 1 else 0 end as rank
+          from summary_search s
+         where s.tsv @@ search_tsquery(p_query)
+    ),
+    page as (
+        select y.id, y.title, y.thumbnail_url, y.thumbnail_grid_url, y.tags, y.created_at, y.source_type,
+               h.rank, count(*) over () as total
+          from hits h
+          join youtube_summaries y on y.id = h.summary_id
+         where p_tag is null or y.tags @> array[p_tag]
+         order by h.rank desc, y.created_at desc
+         limit p_limit offset p_offset
+    )
+    select p.id, p.title, p.thumbnail_url, p.thumbnail_grid_url, p.tags, p.created_at, p.source_type,
+           search_snippet(concat_ws(E'\n', s.doc, nullif(s.transcript, '')), p_query), p.rank::real, p.total
+      from page p
+      join summary_search s on s.summary_id = p.id
+     order by p.rank desc, p.created_at desc;
+$$;
@@ -0,0 +1,160 @@
+import os, time
+import streamlit as st
+from supabase import create_client
+from transcripts import load_transcript
+from related import RelatedIndex
+
+# ── 대시보드 데이터 계층 ─────────────────────────────
+# app.py(UI)와 분리해 두어 벤치마크·스크립트에서도 Streamlit 화면 없이 호출 가능
+
+def setting(section: str, key: str, env: str) -> str:
+    # Streamlit 밖(벤치마크 등)에서는 secrets.toml 대신 환경 변수로
+    return os.environ.get(env) or st.secrets[section][key]
+
+PAGE_SIZE = 15  # 5열 × 3행 카드 그리드
+# 카드 그리드에 필요한 컬럼만 (summary_text 같은 큰 필드는 상세 보기에서 fetch_one으로)
+CARD_COLUMNS = "id, title, thumbnail_url, thumbnail_grid_url, tags, created_at, source_type"
+# 상세 보기 컬럼. 전체 스크립트는 summary_transcripts에 압축 저장 → fetch_transcript로 따로
+DETAIL_COLUMNS = CARD_COLUMNS + ", summary_text, youtube_url"
+TAG_PAGE_SIZE = 1000  # PostgREST max_rows 이하
+TAG_CACHE_TTL = 300   # 초, 봇이 새로 추가한 태그가 사이드바에 반영되기까지 최대 지연
+LIST_CACHE_TTL = 60   # 초, 목록/검색/개수 캐시 (새 요약이 목록에 보이기까지 최대 지연)
+ITEM_CACHE_TTL = 600  # 초, 상세 보기 캐시
+RELATED_REBUILD_TTL = 3600  # 초, 관련 영상 인덱스 전체 재구성 (재요약 등으로 바뀐 태그 반영)
+
+# ── Supabase 클라이언트 ──────────────────────────────
+@st.cache_resource
+def get_client():
+    return create_client(
+        setting("supabase", "url", "SUPABASE_URL"),
+        setting("supabase", "anon_key", "SUPABASE_KEY"),
+    )
+
+def summaries_query(columns: str, tag: str = "", count: str = None):
+    client = get_client()
+    q = client.table("youtube_summaries").select(columns, count=count)
+    if tag:
+        q = q.contains("tags", [tag])
+    return q
+
+def after_cursor(q, cursor):
+    # 키셋 페이지네이션: (created_at, id) 가 cursor보다 작은 행만 → offset 스캔 없음
+    if cursor:
+        created_at, last_id = cursor
+        q = q.or_(f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{last_id})')
+    return q.order("created_at", desc=True).order("id", desc=True)
+
+@st.cache_data(ttl=LIST_CACHE_TTL, show_spinner=False)
+def fetch_summaries(cursor=None, tag: str = ""):
+    """cursor 다음 PAGE_SIZE개와 다음 페이지 존재 여부 (1개 더 가져와서 판단)"""
+    q = after_cursor(summaries_query(CARD_COLUMNS, tag), cursor)
+    rows = q.limit(PAGE_SIZE + 1).execute().data
+    return rows[:PAGE_SIZE], len(rows) > PAGE_SIZE
+
+@st.cache_data(ttl=LIST_CACHE_TTL, show_spinner=False)
+def skip_rows(cursor, n: int, tag: str = ""):
+    """cursor 뒤 n개를 건너뛴 위치의 cursor (id/created_at만 읽음, 페이지 번호로 건너뛸 때)"""
+    q = after_cursor(summaries_query("id, created_at", tag), cursor)
+    rows = q.limit(n).execute().data
+    return (rows[-1]["created_at"], rows[-1]["id"]) if rows else cursor
+
+@st.cache_data(ttl=LIST_CACHE_TTL, show_spinner=False)
+def count_summaries(tag: str = "", exact: bool = False) -> int:
+    # 기본은 플래너 추정치(빠름), 정확한 개수는 요청할 때만
+    res = summaries_query("id", tag, count="exact" if exact else "estimated").limit(1).execute()
+    return res.count or 0
+
+@st.cache_data(ttl=LIST_CACHE_TTL, show_spinner=False)
+def search_summaries(query: str, tag: str = "", page: int = 1):
+    """제목·요약·스크립트 bigram 전문 검색 (순위순) → (결과, 전체 개수)"""
+    client = get_client()
+    res = client.rpc("search_summaries", {
+        "p_query": query,
+        "p_tag": tag or None,
+        "p_limit": PAGE_SIZE,
+        "p_offset": (page - 1) * PAGE_SIZE,
+    }).execute()
+    rows = res.data or []
+    return rows, (rows[0]["total"] if rows else 0)
+
+@st.cache_data(ttl=ITEM_CACHE_TTL, show_spinner=False)
+def fetch_one(item_id: str):
+    client = get_client()
+    res = client.table("youtube_summaries").select(DETAIL_COLUMNS).eq("id", item_id).execute()
+    return res.data[0] if res.data else None
+
+@st.cache_data(ttl=ITEM_CACHE_TTL, show_spinner=False)
+def fetch_transcript(item_id: str) -> str:
+    """전체 스크립트 (📄 전체 STT 탭과 챗봇에서만). 아직 백필 전인 행은 예전 컬럼에서
+    저장된 그대로 반환 (예전 유튜브 스크립트 정리는 backfill_transcripts.py가 한 번만)"""
+    client = get_client()
+    text = load_transcript(client, item_id)
+    if text is None:
+        res = client.table("youtube_summaries").select("video_stt_url").eq("id", item_id).execute()
+        text = (res.data[0].get("video_stt_url") if res.data else None) or ""
+    return text
+
+@st.cache_data(ttl=TAG_CACHE_TTL, show_spinner=False)
+def fetch_all_tags():
+    # 트리거로 유지되는 tag_counts 인덱스에서 (태그, 개수) 목록
+    # PostgREST는 요청 1회에 최대 max_rows(Supabase 기본 1000)행만 주므로 범위로 나눠 모두 읽음
+    client = get_client()
+    tags, start = [], 0
+    while True:
+        rows = (
+            client.table("tag_counts").select("tag, count").gt("count", 0).order("tag")
+            .range(start, start + TAG_PAGE_SIZE - 1).execute().data
+        )
+        tags += [(row["tag"], row["count"]) for row in rows]
+        if len(rows) < TAG_PAGE_SIZE:
+            return tags
+        start += TAG_PAGE_SIZE
+
+# ── 관련 영상 ────────────────────────────────────────
+_related = None  # 마지막으로 만든 인덱스 (삭제 시 이미 있는 인덱스만 고치도록)
+
+@st.cache_resource(ttl=RELATED_REBUILD_TTL, show_spinner=False)
+def related_index() -> RelatedIndex:
+    """모든 세션이 공유하는 태그 유사도 인덱스. 카드 컬럼만 키셋 페이지로 한 번 읽어 구성"""
+    global _related
+    index = RelatedIndex()
+    cursor = None
+    while True:
+        rows = after_cursor(summaries_query(CARD_COLUMNS), cursor).limit(1000).execute().data
+        for row in rows:
+            index.add(row)
+        if len(rows) < 1000:
+            break
+        cursor = (rows[-1]["created_at"], rows[-1]["id"])
+    index.synced = time.monotonic()
+    _related = index
+    return index
+
+def sync_related_index(index: RelatedIndex):
+    # 봇(save_to_db)이 새로 저장한 요약만 추가: 색인된 최신 created_at 이후 행 (LIST_CACHE_TTL마다)
+    if time.monotonic() - index.synced < LIST_CACHE_TTL:
+        return
+    index.synced = time.monotonic()
+    q = summaries_query(CARD_COLUMNS)
+    if index.latest:
+        q = q.gt("created_at", index.latest)
+    for row in q.order("created_at").limit(1000).execute().data:
+        index.add(row)
+
+def fetch_related(item: dict, k: int = 5) -> list:
+    """item과 태그가 많이 겹치는 요약 k개 (메모리 인덱스 조회)"""
+    index = related_index()
+    sync_related_index(index)
+    return index.top_k(item["id"], item.get("tags") or [], k)
+
+def invalidate_caches():
+    for fn in (fetch_summaries, skip_rows, count_summaries, search_summaries, fetch_one, fetch_transcript, fetch_all_tags):
+        fn.clear()
+
+def delete_summary(item_id: str):
+    client = get_client()
+    client.table("youtube_summaries").delete().eq("id", item_id).execute()
+    # 인덱스가 아직 없으면 만들지 않음 (전체 테이블 스캔) → 다음에 만들 때는 삭제된 행이 빠져 있음
+    if _related is not None:
+        _related.remove(item_id)
+    invalidate_caches()
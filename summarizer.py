@@ -0,0 +1,282 @@
+import os, re, time, asyncio
+from openai import AsyncOpenAI
+from metrics import (
+    record_usage, OPENAI_REQUESTS, OPENAI_SECONDS, OPENAI_FIRST_TOKEN_SECONDS, OPENAI_INPUT_TOKENS, OPENAI_TRUNCATED,
+)
+
+# ── 요약 (프롬프트 / 모델 선택 / OpenAI 호출) ─────────
+# bot.py와 resummarize.py가 같이 씀. import해도 작업 큐·텔레그램·Supabase를 건드리지 않도록
+# OpenAI 클라이언트와 요약 설정만 둠
+
+# ── 설정 ────────────────────────────────────────────
+SUMMARY_CHUNK_CHARS = int(os.environ.get("SUMMARY_CHUNK_CHARS", "12000"))  # 이보다 길면 구간별 요약 후 합침
+SUMMARY_MAP_CONCURRENCY = int(os.environ.get("SUMMARY_MAP_CONCURRENCY", "4"))
+# 요약 모델 선택: 입력이 짧으면(인스타그램 캡션, 짧은 영상) 작은 모델로 → 더 빠르고 저렴
+SUMMARY_MODEL         = os.environ.get("SUMMARY_MODEL", "gpt-4o")
+SUMMARY_SMALL_MODEL   = os.environ.get("SUMMARY_SMALL_MODEL", "gpt-4o-mini")
+SMALL_MODEL_MAX_INPUT = int(os.environ.get("SMALL_MODEL_MAX_INPUT", "1500"))      # 입력 토큰, 이하면 작은 모델
+SUMMARY_OUTPUT_RATIO  = float(os.environ.get("SUMMARY_OUTPUT_RATIO", "0.5"))      # 출력 예산 = 입력 토큰 × 비율
+MAX_SUMMARY_TOKENS    = 4096
+CHUNK_SUMMARY_TOKENS  = 1024
+# 외부 API 전체 동시 호출 상한 (봇에서는 모든 채팅·단계 공유)
+OPENAI_CONCURRENCY = int(os.environ.get("OPENAI_CONCURRENCY", "8"))
+
+ai = AsyncOpenAI(api_key=os.environ["OPENAI_API_KEY"])
+map_semaphore = asyncio.Semaphore(SUMMARY_MAP_CONCURRENCY)  # 구간 요약 동시 호출 수 (전체 작업 공유)
+openai_semaphore = asyncio.Semaphore(OPENAI_CONCURRENCY)
+
+# ── 프롬프트 ────────────────────────────────────────
+YOUTUBE_PROMPT = """당신은 유튜브 영상을 요약하는 전문가입니다.
+youtube transcript가 인입됩니다. 약간의 노이즈가 있기 때문에 그것을 감안하여 아래 요약 템플릿 형태로 요약을 수행해주세요.
+또한 keyword tag도 5개 정도 정의해서 출력
+tag안에 들어가는 키워드는 명사
+
+---
+## 🚀 [제목] (Title)
+
+### 💡 핵심 비유 (Analogy)
+- 내용을 한눈에 파악할 수 있는 강력하고 기억하기 쉬운 비유 또는 캐치프레이즈
+
+### ✨ 핵심 요약 (Key Points)
+- 가장 중요한 내용 3가지 요약
+    - Point 1
+    - Point 2
+    - Point 3
+
+### 📚 상세 내용 (Details)
+- 핵심 요약에서 제시된 내용에 대한 구체적인 설명, 배경 또는 주요 특징 기술
+
+### 🤔 비판적 관점 (Critical Points)
+- 해당 내용에 대해 주의 깊게 생각하거나 경계해야 할 지점
+    - Point 1
+    - Point 2
+
+### 📊 숫자 (Numbers)
+*(선택 사항: 관련 데이터가 중요할 경우)*
+- 핵심 통계 1:
+- 핵심 통계 2:
+
+### 👟 쉬운 첫걸음 (Easy Next Step)
+- 핵심 교훈을 바탕으로, 가장 마찰이 적고 즉시 실행 가능한 구체적인 행동 1가지 제안
+
+---
+### 🧩 핵심 개념 & 용어
+- 기술적으로 중요하거나 어려운 핵심 용어 3개를 비유를 통해 한 줄로 설명
+    - **용어 1**:
+    - **용어 2**:
+    - **용어 3**:
+
+### 📖 참고: 선행 지식 (Prerequisites)
+- 이 정보를 완전히 이해하기 위해 필요한 사전 지식이나 조건
+
+---
+[TAGS] 태그1, 태그2, 태그3, 태그4, 태그5
+"""
+
+INSTAGRAM_PROMPT = """당신은 인스타그램 게시물을 요약하는 전문가입니다.
+아래 인스타그램 캐션(caption) 텍스트를 분석하고 요약해주세요.
+keyword tag도 5개 정도 정의해서 출력 (tag는 명사)
+
+---
+## 📸 [제목] (Title)
+
+### 💡 핵심 메시지 (Key Message)
+- 게시물의 핵심 메시지를 한 줄로 요약
+
+### ✨ 주요 내용 (Key Points)
+- 중요한 내용 3가지
+    - Point 1
+    - Point 2
+    - Point 3
+
+### 📚 상세 내용 (Details)
+- 게시물의 구체적인 내용, 맥락 설명
+
+### 🤔 인사이트 (Insights)
+- 이 게시물에서 얻을 수 있는 인사이트나 시사점
+
+### 👟 액션 아이템 (Action Item)
+- 이 게시물을 보고 바로 실행할 수 있는 행동 1가지
+
+---
+[TAGS] 태그1, 태그2, 태그3, 태그4, 태그5
+"""
+
+CHUNK_PROMPT = """다음은 긴 콘텐츠의 일부 구간입니다.
+이 구간의 핵심 내용, 주요 주장과 근거, 숫자/통계, 중요한 용어를 빠짐없이 한국어 불릿으로 정리해주세요.
+노이즈는 감안하되 원문에 없는 내용은 추측하지 마세요.
+"""
+
+# 고정 지시문은 system 메시지로, 본문은 user 메시지로 분리
+# → 요청마다 앞부분이 똑같음. OpenAI 프롬프트 캐시는 1024토큰 이상 앞부분만 재사용하므로
+#   지금 길이의 지시문은 캐시되지 않지만, 지시문을 캐시용으로 부풀리지는 않음 (짧은 입력의 비용·지연이 더 커짐)
+# min_tokens: 템플릿 마지막의 [TAGS]까지 잘리지 않고 나올 최소 출력 예산
+SUMMARY_PROMPTS = {
+    "youtube":   {"system": YOUTUBE_PROMPT,   "label": "transcript", "min_tokens": 2048},
+    "instagram": {"system": INSTAGRAM_PROMPT, "label": "caption",    "min_tokens": 1024},
+}
+
+REDUCE_NOTE = "(아래는 긴 원문을 순서대로 구간별 요약한 노트입니다. 전체 흐름을 하나의 요약으로 합쳐주세요.)\n\n"
+
+# ── 요약 결과 파싱 ───────────────────────────────────
+def parse_tags(summary: str) -> list:
+    m = re.search(r"\[TAGS\]\s*(.+)", summary)
+    if m:
+        return [t.strip() for t in m.group(1).split(",") if t.strip()][:5]
+    return []
+
+def parse_title(summary: str) -> str:
+    m = re.search(r"##\s*[🚀📸]\s*(.+?)(?:\s*\(Title\))?$", summary, re.MULTILINE)
+    if m:
+        return m.group(1).strip().strip("[]")
+    return "제목 없음"
+
+def parse_one_line(summary: str) -> str:
+    m = re.search(r"(?:핵심 비유|핵심 메시지).*?\n-\s*(.+)", summary)
+    if m:
+        return m.group(1).strip()
+    return ""
+
+# ── 긴 원문 나누기 ───────────────────────────────────
+def split_text(text: str, max_chars: int) -> list:
+    """문장 경계 기준으로 max_chars 이하 조각으로 나눔 (구두점 없는 자동자막은 단어 기준)"""
+    pieces = []
+    for sentence in re.split(r"(?<=[.!?…。])\s+", text):
+        if len(sentence) <= max_chars:
+            pieces.append(sentence)
+            continue
+        words, buf = sentence.split(" "), ""
+        for w in words:
+            if buf and len(buf) + len(w) + 1 > max_chars:
+                pieces.append(buf)
+                buf = ""
+            buf = f"{buf} {w}" if buf else w[:max_chars]
+        if buf:
+            pieces.append(buf)
+
+    chunks, buf = [], ""
+    for p in pieces:
+        if buf and len(buf) + len(p) + 1 > max_chars:
+            chunks.append(buf)
+            buf = ""
+        buf = f"{buf} {p}" if buf else p
+    if buf:
+        chunks.append(buf)
+    return chunks
+
+# ── 토큰 계산 / 모델 선택 ────────────────────────────
+try:
+    import tiktoken
+    token_encoding = tiktoken.get_encoding("o200k_base")  # gpt-4o 계열 토크나이저
+except Exception as e:
+    # 패키지가 없거나 인코딩 파일을 못 받는 환경(오프라인 벤치마크 등) → 근사치
+    print(f"tiktoken 사용 불가, 토큰 수는 근사치로 계산: {e}")
+    token_encoding = None
+
+def count_tokens(text: str) -> int:
+    if token_encoding:
+        return len(token_encoding.encode(text, disallowed_special=()))
+    # 한글은 글자당 약 1토큰, 영어는 3~4글자당 1토큰 → UTF-8 바이트/3 이면 넉넉함
+    return len(text.encode("utf-8")) // 3 + 1
+
+def pick_model(input_tokens: int) -> str:
+    return SUMMARY_SMALL_MODEL if input_tokens <= SMALL_MODEL_MAX_INPUT else SUMMARY_MODEL
+
+def output_budget(input_tokens: int, min_tokens: int) -> int:
+    # 요약이 원문보다 길 필요는 없음 → 입력에 비례하되 템플릿을 다 채울 최소치는 보장
+    return max(min_tokens, min(MAX_SUMMARY_TOKENS, int(input_tokens * SUMMARY_OUTPUT_RATIO)))
+
+async def complete(system: str, user: str, model: str, max_tokens: int,
+                   purpose: str = "summary", on_delta=None) -> str:
+    """purpose: 메트릭 라벨이자 prompt_cache_key (같은 지시문끼리 같은 캐시로 라우팅)"""
+    messages = [{"role": "system", "content": system}, {"role": "user", "content": user}]
+    OPENAI_INPUT_TOKENS.labels(model, purpose).observe(count_tokens(user))
+    finish = None
+    try:
+        # 전체 프로세스의 동시 호출 수 제한 (OpenAI 속도 제한에 걸려 실패하기 전에 대기)
+        async with openai_semaphore:
+            start = time.monotonic()
+            if on_delta is None:
+                res = await ai.chat.completions.create(
+                    model=model,
+                    max_tokens=max_tokens,
+                    messages=messages,
+                    extra_body={"prompt_cache_key": purpose},
+                )
+                record_usage(model, res.usage)
+                text = res.choices[0].message.content
+                finish = res.choices[0].finish_reason
+            else:
+                # 스트리밍: 토큰이 도착할 때마다 지금까지의 전체 텍스트를 on_delta로 전달
+                stream = await ai.chat.completions.create(
+                    model=model,
+                    max_tokens=max_tokens,
+                    messages=messages,
+                    stream=True,
+                    stream_options={"include_usage": True},  # 마지막 청크에 토큰 사용량
+                    extra_body={"prompt_cache_key": purpose},
+                )
+                text = ""
+                async for chunk in stream:
+                    if chunk.usage:
+                        record_usage(model, chunk.usage)
+                    if not chunk.choices:
+                        continue
+                    finish = chunk.choices[0].finish_reason or finish
+                    if chunk.choices[0].delta.content:
+                        if not text:
+                            OPENAI_FIRST_TOKEN_SECONDS.labels(model, purpose).observe(time.monotonic() - start)
+                        text += chunk.choices[0].delta.content
+                        on_delta(text)
+    except Exception:
+        OPENAI_REQUESTS.labels(model, "error").inc()
+        raise
+    OPENAI_REQUESTS.labels(model, "ok").inc()
+    OPENAI_SECONDS.labels(model, purpose).observe(time.monotonic() - start)
+    if finish == "length":
+        # 출력 예산이 모자람 → SUMMARY_OUTPUT_RATIO / min_tokens 조정 필요
+        OPENAI_TRUNCATED.labels(model, purpose).inc()
+        print(f"요약이 max_tokens({max_tokens})에서 잘림 ({model}, {purpose})")
+    return text
+
+async def summarize_chunk(chunk: str, index: int, total: int) -> str:
+    async with map_semaphore:
+        return await complete(
+            CHUNK_PROMPT, f"[구간 {index}/{total}]\n{chunk}",
+            model=pick_model(count_tokens(chunk)), max_tokens=CHUNK_SUMMARY_TOKENS, purpose="chunk",
+        )
+
+def summary_input(content: str, source_type: str) -> str:
+    # 요약 요청의 user 메시지 (resummarize.py의 Batch API 요청도 같은 형식)
+    return f"{SUMMARY_PROMPTS[source_type]['label']}:\n{content}"
+
+async def summarize(content: str, source_type: str, on_delta=None, on_status=None) -> str:
+    """on_delta: 스트리밍 중 부분 요약 콜백, on_status: 구간 요약 진행 상황 콜백"""
+    prompt = SUMMARY_PROMPTS[source_type]
+    # 모델과 출력 예산은 원문 기준 (구간 요약을 합칠 때도 긴 영상이면 큰 모델·넉넉한 예산)
+    tokens = count_tokens(content)
+    model = pick_model(tokens)
+    max_tokens = output_budget(tokens, prompt["min_tokens"])
+    print(f"요약 모델 {model} (입력 약 {tokens}토큰, 출력 예산 {max_tokens})")
+
+    if len(content) > SUMMARY_CHUNK_CHARS:
+        # 긴 transcript: 구간별 요약(map)을 병렬로 → 기존 템플릿으로 합치기(reduce)
+        chunks = split_text(content, SUMMARY_CHUNK_CHARS)
+        print(f"긴 콘텐츠 {len(content)}자 → {len(chunks)}개 구간으로 나눠 요약")
+        done = 0
+
+        async def run(chunk: str, index: int) -> str:
+            nonlocal done
+            note = await summarize_chunk(chunk, index, len(chunks))
+            done += 1
+            if on_status:
+                on_status(f"🧩 긴 콘텐츠라 구간별로 요약 중... ({done}/{len(chunks)})")
+            return note
+
+        notes = await asyncio.gather(*(run(chunk, i) for i, chunk in enumerate(chunks, 1)))
+        content = REDUCE_NOTE + "\n\n".join(f"[구간 {i}/{len(notes)}]\n{n}" for i, n in enumerate(notes, 1))
+
+    return await complete(
+        prompt["system"], summary_input(content, source_type),
+        model=model, max_tokens=max_tokens, purpose=f"summary-{source_type}", on_delta=on_delta,
+    )
@@ -0,0 +1,233 @@
+import asyncio, base64, gzip, os, random, re, time
+
+try:
+    import zstandard  # 선택: TRANSCRIPT_CODEC=zstd 일 때만 필요
+except ImportError:
+    zstandard = None
+
+# ── 여러 소스에서 트랜스크립트 가져오기 (헤징 + 백오프) ──
+# 소스 = async fn(video_ids) -> {video_id: text}. 일부만 돌려줘도 됨
+# 가장 빠르고 성공률 높은 소스부터 시작하고, HEDGE_DELAY 안에 끝나지 않으면
+# 다음 소스를 동시에 시작 → 먼저 성공한 결과를 쓰고 나머지는 취소
+# 자막이 없는 영상은 NO_CAPTIONS로 돌려줌 → 같은 소스에서는 재시도하지 않음 (빠진 id만 일시 오류로 재시도)
+# NO_CAPTIONS는 모든 소스가 같은 답을 하거나 authoritative 소스(자막 트랙 목록을 직접 보는 소스)가 답할 때만 확정,
+# 그 전에는 다음 소스가 다시 시도
+NO_CAPTIONS = ""
+
+
+class SourceStats:
+    """소스별 지연(EWMA)과 성공률. 다음 호출 때 어떤 소스를 먼저 쓸지 정하는 데 사용"""
+
+    def __init__(self, alpha: float = 0.3):
+        self.alpha = alpha
+        self.latency = None
+        self.ok = 0
+        self.fail = 0
+
+    def record(self, latency: float, ok: int, fail: int):
+        self.latency = latency if self.latency is None else self.alpha * latency + (1 - self.alpha) * self.latency
+        self.ok += ok
+        self.fail += fail
+
+    @property
+    def success_rate(self) -> float:
+        # 표본이 적을 때 한두 번의 결과에 휘둘리지 않도록 (ok+1)/(n+2)
+        return (self.ok + 1) / (self.ok + self.fail + 2)
+
+    def score(self, default_latency: float) -> float:
+        return (self.latency if self.latency is not None else default_latency) / self.success_rate
+
+
+async def with_backoff(fetch, ids: list, attempts: int, base_delay: float, max_delay: float, name: str = "",
+                       on_result=None) -> dict:
+    """실패하거나 일부가 비면 빠진 것만 지수 백오프 + 지터로 재시도
+    on_result: 시도마다 새로 얻은 {id: text}를 바로 전달 (재시도를 기다리지 않도록)"""
+    results = {}
+    for attempt in range(attempts):
+        missing = [i for i in ids if i not in results]
+        if not missing:
+            break
+        try:
+            found = await fetch(missing) or {}
+            results.update(found)
+            if on_result and found:
+                on_result(found)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[{name}] 트랜스크립트 오류 (시도 {attempt+1}/{attempts}): {e}")
+        if len(results) < len(ids) and attempt + 1 < attempts:
+            await asyncio.sleep(min(max_delay, base_delay * 2 ** attempt) * random.uniform(0.5, 1.5))
+    return results
+
+
+class HedgedFetcher:
+    def __init__(self, sources: dict, hedge_delay: float, attempts: int = 3,
+                 base_delay: float = 2.0, max_delay: float = 30.0, deadline: float = None,
+                 authoritative=(), on_record=None):
+        self.sources = sources  # 이름 → async fn(ids)
+        self.authoritative = set(authoritative)  # NO_CAPTIONS를 바로 확정해도 되는 소스
+        self.hedge_delay = hedge_delay
+        self.deadline = deadline  # 초, fetch 한 번의 전체 상한 (지나면 못 가져온 id는 빠진 채로 반환)
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.on_record = on_record  # (name, latency, ok, fail) 콜백 (메트릭용)
+        self.stats = {name: SourceStats() for name in sources}
+
+    def ranked(self) -> list:
+        # 아직 기록이 없는 소스는 등록 순서대로 (첫 소스가 기본 우선)
+        order = list(self.sources)
+        return sorted(order, key=lambda n: (self.stats[n].score(self.hedge_delay), order.index(n)))
+
+    async def _run(self, name: str, ids: list, on_result=None) -> dict:
+        start = time.monotonic()
+        res = await with_backoff(self.sources[name], ids, self.attempts, self.base_delay, self.max_delay, name,
+                                 on_result=on_result)
+        latency = time.monotonic() - start
+        self.stats[name].record(latency, ok=len(res), fail=len(ids) - len(res))
+        if self.on_record:
+            self.on_record(name, latency, len(res), len(ids) - len(res))
+        return res
+
+    async def fetch(self, ids: list, on_result=None) -> dict:
+        """on_result(id, text): id마다 처음 결과가 나오는 즉시 호출 (배치의 나머지를 기다리지 않음)"""
+        results = {}
+        no_captions = {}  # id → NO_CAPTIONS라고 답한 소스들 (아직 확정 전)
+        waiting = self.ranked()
+        running = {}
+        end = time.monotonic() + self.deadline if self.deadline else None
+
+        def resolve(name: str, found: dict):
+            for k, v in found.items():
+                if k not in ids or k in results:
+                    continue
+                if v == NO_CAPTIONS:
+                    said = no_captions.setdefault(k, set())
+                    said.add(name)
+                    if name not in self.authoritative and said < set(self.sources):
+                        continue  # 다른 소스에도 물어봄
+                results[k] = v
+                if on_result:
+                    on_result(k, v)
+
+        def launch():
+            name = waiting.pop(0)
+            missing = [i for i in ids if i not in results]
+            on_found = lambda found: resolve(name, found)
+            running[asyncio.create_task(self._run(name, missing, on_found))] = name
+
+        launch()
+        try:
+            while running:
+                timeout = self.hedge_delay if waiting else None
+                if end is not None:
+                    left = end - time.monotonic()
+                    if left <= 0:
+                        print(f"트랜스크립트 조회 {self.deadline:.0f}초 초과 → {len(ids) - len(results)}개 포기")
+                        break
+                    timeout = left if timeout is None else min(timeout, left)
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if waiting and (end is None or time.monotonic() < end):
+                        # 지연 임계값 초과 → 다음 소스를 헤지로 동시에 시작
+                        print(f"트랜스크립트 헤지: {list(running.values())} 응답 지연 → {waiting[0]} 추가")
+                        launch()
+                    continue
+                for task in done:
+                    resolve(running.pop(task), task.result())
+                if len(results) == len(ids):
+                    break
+                if waiting and not running:
+                    # 끝났는데 빠진 게 있으면 다음 소스로 바로 넘어감
+                    launch()
+        finally:
+            for task in running:
+                task.cancel()
+        return results
+
+
+# ── 자막 정리 (요약 전) ─────────────────────────────
+# 자동 자막은 앞 조각의 끝부분이 다음 조각 앞에 다시 나오고([음악] 같은 표시, 추임새도 많음)
+# 그대로 두면 요약 구간(SUMMARY_CHUNK_CHARS)과 챗봇 컨텍스트(8000자)를 잡아먹음
+TRANSCRIPT_MARK_EVERY = float(os.environ.get("TRANSCRIPT_MARK_EVERY", "30"))  # 초, 타임스탬프 기록 간격
+FILLERS = {"음", "음.", "음...", "어", "어.", "어...", "아", "에", "으", "흠", "uh", "um", "umm", "uhm", "erm", "hmm", "mm"}
+NOISE_RE = re.compile(
+    r"\[(?:음악|박수|웃음|환호|music|applause|laughter|inaudible|silence)[^\]]*\]|\((?:음악|박수|웃음)\)|<[^>]+>|&nbsp;|>>|♪+",
+    re.IGNORECASE,
+)
+MAX_OVERLAP_WORDS = 40
+
+
+def overlap_words(tail: list, words: list) -> int:
+    """tail의 끝과 words의 앞이 겹치는 단어 수. 우연히 한 단어만 같은 경우는 무시"""
+    for k in range(min(len(tail), len(words), MAX_OVERLAP_WORDS), 0, -1):
+        if tail[-k:] == words[:k] and (k >= 2 or k == len(words)):
+            return k
+    return 0
+
+
+def clean_transcript(segments: list) -> dict:
+    """segments: [(시작 초 또는 None, 텍스트)] → {"text", "timestamps": [[초, 글자 위치]], "raw_chars"}
+    겹쳐 반복되는 조각·소음 표시·추임새·3번 이상 반복되는 단어를 지우고 공백을 하나로"""
+    words, marks = [], []
+    raw_chars = chars = 0
+    last_mark = None
+    for start, text in segments:
+        raw_chars += len(text) + 1
+        seg = [w for w in NOISE_RE.sub(" ", text).split() if w.lower() not in FILLERS]
+        seg = seg[overlap_words(words, seg):]
+        if not seg:
+            continue
+        if start is not None and (last_mark is None or start - last_mark >= TRANSCRIPT_MARK_EVERY):
+            marks.append([int(start), chars])
+            last_mark = start
+        for word in seg:
+            if len(words) >= 2 and words[-1] == word and words[-2] == word:
+                continue  # 말 더듬 ("그 그 그 그") → 두 번까지만
+            words.append(word)
+            chars += len(word) + 1
+    return {"text": " ".join(words), "timestamps": marks, "raw_chars": max(0, raw_chars - 1)}
+
+
+# ── 스크립트 압축 저장 (youtube_summaries와 분리, sql/007) ──
+# zstd로 저장하면 스크립트를 읽는 모든 곳(봇·대시보드)에 zstandard가 있어야 함
+TRANSCRIPT_CODEC = os.environ.get("TRANSCRIPT_CODEC", "gzip")
+
+
+def compress_transcript(text: str) -> tuple:
+    """→ (encoding, 압축 바이트)"""
+    raw = text.encode("utf-8")
+    if TRANSCRIPT_CODEC == "zstd" and zstandard:
+        return "zstd", zstandard.ZstdCompressor(level=10).compress(raw)
+    return "gzip", gzip.compress(raw, compresslevel=9)
+
+
+def decompress_transcript(encoding: str, data: bytes) -> str:
+    if encoding == "zstd":
+        return zstandard.ZstdDecompressor().decompress(data).decode("utf-8")
+    return gzip.decompress(data).decode("utf-8")
+
+
+def save_transcript(client, summary_id: str, text: str, timestamps: list = None) -> dict:
+    """압축본 저장 + 검색 색인 갱신 (save_transcript RPC). 다시 호출해도 덮어쓰기만 함
+    timestamps: clean_transcript의 [[초, 글자 위치]] (자막에 시간 정보가 있을 때만)"""
+    encoding, data = compress_transcript(text)
+    client.rpc("save_transcript", {
+        "p_summary_id": summary_id,
+        "p_encoding":   encoding,
+        "p_data":       base64.b64encode(data).decode("ascii"),
+        "p_raw_chars":  len(text),
+        "p_text":       text,
+        "p_timestamps": timestamps,
+    }).execute()
+    return {"encoding": encoding, "raw_bytes": len(text.encode("utf-8")), "stored_bytes": len(data)}
+
+
+def load_transcript(client, summary_id: str):
+    """저장된 스크립트. 아직 옮기지 않은 행이면 None"""
+    res = client.rpc("get_transcript", {"p_summary_id": summary_id}).execute()
+    if not res.data:
+        return None
+    row = res.data[0]
+    return decompress_transcript(row["encoding"], base64.b64decode(row["data"]))